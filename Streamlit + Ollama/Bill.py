@@ -4,7 +4,7 @@ class Bill:
     def __init__(self, creditor, date, amount, recurring=False):
         self.creditor = creditor
         self.date = date
-        self.amount = float(amount.replace(",", ".")) if amount else None
+        self.amount = float(str(amount).replace(",", ".")) if amount not in (None, "") else None
         self.recurring = recurring
         self.id = self.generate_id()
 
@@ -1,29 +1,22 @@
 
 import streamlit as st
 import datetime
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mtick
-import seaborn as sns
-from dateutil.relativedelta import relativedelta
 from collections import defaultdict
-from utils import parse_date  
+from profiler import traced, len_of_first_arg
+from charts import bar_chart, stacked_bar_chart, series_chart
+
+
+# pandas and dateutil are imported on first use so that startup, and sessions
+# with nothing to chart, don't pay for them. Plotting libraries load in charts.
 
 def build_bills_df(bills):
-    """Construct a DataFrame from bills in session state."""
-    data = []
-    for b in bills:
-        if b.date:
-            dt = parse_date(b.date)
-            year_month = dt.strftime("%Y-%m")
-            data.append({
-                "year_month": year_month,
-                "amount": float(b.amount),  
-                "recurring": b.recurring,
-                "creditor": b.creditor
-            })
-    return pd.DataFrame(data)
+    """
+    DataFrame of the session BillStore. The store caches its frame until the
+    bills change; a copy is returned because the renderers add columns.
+    """
+    return bills.frame().copy()
 
+@traced("analytics.render_detailed_monthly_breakdown", rows=len_of_first_arg)
 def render_detailed_monthly_breakdown(df):
     st.subheader("Detailed Monthly Breakdown by Creditor")
     df_monthly = df.groupby(["year_month", "creditor"])["amount"].sum().reset_index()
@@ -31,7 +24,9 @@ def render_detailed_monthly_breakdown(df):
     pivot_monthly["Total"] = pivot_monthly.sum(axis=1)
     st.dataframe(pivot_monthly)
 
+@traced("analytics.render_yearly_recurring_table", rows=len_of_first_arg)
 def render_yearly_recurring_table(df):
+    import pandas as pd
     st.subheader("Yearly Recurring Table (12× for Recurring)")
     if df.empty or "creditor" not in df.columns:
         st.info("Missing data for yearly recurring table.")
@@ -64,50 +59,62 @@ def render_yearly_recurring_table(df):
     df_yearly["Total"] = df_yearly.sum(axis=1)
     st.dataframe(df_yearly)
 
+@traced("analytics.render_monthly_total_spending", rows=len_of_first_arg)
 def render_monthly_total_spending(df):
     st.subheader("Monthly Total Spending")
-    monthly_totals = df.groupby("year_month")["amount"].sum().sort_index()
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=monthly_totals.index, y=monthly_totals.values)
-    plt.title("Total Monthly Spending", fontsize=15)
-    plt.xlabel("Year-Month", fontsize=12)
-    plt.ylabel("Total kr", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
+    monthly_totals = df.groupby("year_month", as_index=False)["amount"].sum().sort_values("year_month")
+    bar_chart(monthly_totals, "year_month", "amount", "Total Monthly Spending",
+              "Year-Month", "Total kr", title_size=15)
 
+@traced("analytics.render_monthly_recurring_vs_onetime", rows=len_of_first_arg)
 def render_monthly_recurring_vs_onetime(df):
     st.subheader("Monthly Spend: Recurring vs One-time")
     monthly_breakdown = df.groupby(["year_month", "recurring"])["amount"].sum().unstack(fill_value=0).sort_index()
-    plt.figure(figsize=(10, 6))
-    monthly_breakdown.plot(kind="bar", stacked=True)
-    plt.title("Recurring vs One-time Spending", fontsize=15)
-    plt.xlabel("Year-Month", fontsize=12)
-    plt.ylabel("Total kr", fontsize=12)
-    plt.xticks(rotation=45, ha='right')
-    plt.legend(title="Bill Type", labels=["One-time", "Recurring"])
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
+    stacked_bar_chart(monthly_breakdown, "Recurring vs One-time Spending", "Year-Month", "Total kr",
+                      "Bill Type", series_labels={False: "One-time", True: "Recurring"})
 
+@traced("analytics.render_yearly_total_spending", rows=len_of_first_arg)
 def render_yearly_total_spending(df):
     st.subheader("Yearly Total Spending")
     df["year"] = df["year_month"].apply(lambda ym: ym.split("-")[0])
-    yearly_totals = df.groupby("year")["amount"].sum().sort_index()
-    plt.figure(figsize=(10, 6))
-    sns.barplot(x=yearly_totals.index, y=yearly_totals.values)
-    plt.title("Total Yearly Spending", fontsize=15)
-    plt.xlabel("Year", fontsize=12)
-    plt.ylabel("Total kr", fontsize=12)
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
-
-def render_projected_recurring_bills(bills):
+    yearly_totals = df.groupby("year", as_index=False)["amount"].sum().sort_values("year")
+    bar_chart(yearly_totals, "year", "amount", "Total Yearly Spending",
+              "Year", "Total kr", rotate=False, title_size=15)
+
+@traced("analytics.render_projected_recurring_bills", rows=len_of_first_arg)
+def render_projected_recurring_bills(bills, detected=None):
+    """
+    Project recurring costs over the next 12 months.
+
+    Parameters:
+        bills (iterable): Bill objects; those marked recurring are projected.
+        detected (list): Optional recurring transaction creditors from
+            db.get_recurring_creditors(), projected at their monthly-equivalent amount.
+
+    A payee that is both uploaded as a PDF bill and paid from the bank
+    statement is projected once, from the bill: detected creditors that
+    recurring.same_creditor() matches to a recurring bill are skipped.
+    """
+    import pandas as pd
+    from dateutil.relativedelta import relativedelta
+    from recurring import same_creditor
     st.subheader("Projected Recurring Bills (Next 12 Months)")
     recurring_bills = [b for b in bills if b.recurring and b.amount]
-    if not recurring_bills:
+    bill_creditors = {b.creditor for b in recurring_bills}
+    detected = [
+        d for d in (detected or [])
+        if d["median_interval"]
+        and not any(same_creditor(c, d["creditor"]) for c in bill_creditors)
+    ]
+    if not recurring_bills and not detected:
         st.info("No recurring bills to project.")
         return
-    df_r = pd.DataFrame([{"creditor": b.creditor, "amount": float(b.amount)} for b in recurring_bills])
+    rows = [{"creditor": b.creditor, "amount": float(b.amount)} for b in recurring_bills]
+    rows += [
+        {"creditor": d["creditor"], "amount": d["mean_amount"] * 30.44 / d["median_interval"]}
+        for d in detected
+    ]
+    df_r = pd.DataFrame(rows)
     creditor_sums = df_r.groupby("creditor")["amount"].sum()
     start_date = datetime.date.today()
     months = [start_date.replace(day=1) + relativedelta(months=i) for i in range(12)]
@@ -120,30 +127,15 @@ def render_projected_recurring_bills(bills):
         df_projection[cred] = amt
     df_projection["Total"] = df_projection.sum(axis=1)
     
-    # Line chart
-    plt.figure(figsize=(12, 6))
-    for column in df_projection.drop(columns="Total").columns:
-        plt.plot(df_projection.index, df_projection[column], label=column, marker='o')
-    plt.title("Projected Next 12 Months (Line)", fontsize=15)
-    plt.xlabel("Year-Month", fontsize=12)
-    plt.ylabel("kr", fontsize=12)
-    plt.legend(title="Creditors", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
-    
-    # Area chart
-    plt.figure(figsize=(12, 6))
-    df_projection.drop(columns="Total").plot.area()
-    plt.title("Projected Next 12 Months (Area)", fontsize=15)
-    plt.xlabel("Year-Month", fontsize=12)
-    plt.ylabel("kr", fontsize=12)
-    plt.legend(title="Creditors", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
+    series_chart(df_projection.drop(columns="Total"), "Projected Next 12 Months (Line)",
+                 "Year-Month", "kr", "Creditors")
+    series_chart(df_projection.drop(columns="Total"), "Projected Next 12 Months (Area)",
+                 "Year-Month", "kr", "Creditors", area=True)
 
+@traced("analytics.render_last_year_step_function_chart", rows=len_of_first_arg)
 def render_last_year_step_function_chart(df):
+    import pandas as pd
+    from dateutil.relativedelta import relativedelta
     st.subheader("Last Year Step-Function Chart")
     df_rec = df[df["recurring"] == True].copy()
     if df_rec.empty:
@@ -179,117 +171,79 @@ def render_last_year_step_function_chart(df):
 
     df_projection["Total"] = df_projection.sum(axis=1)
     
-    plt.figure(figsize=(12, 6))
-    for column in df_projection.drop(columns="Total").columns:
-        plt.plot(df_projection.index, df_projection[column], label=column, marker='o')
-    plt.title("Last Year Step-Function: Earliest Price for Prior Months", fontsize=15)
-    plt.xlabel("Year-Month", fontsize=12)
-    plt.ylabel("kr", fontsize=12)
-    plt.legend(title="Creditors", bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.xticks(rotation=45, ha='right')
-    plt.tight_layout()
-    st.pyplot(plt.gcf())
+    series_chart(df_projection.drop(columns="Total"),
+                 "Last Year Step-Function: Earliest Price for Prior Months",
+                 "Year-Month", "kr", "Creditors")
     st.caption("Each creditor uses its earliest known bill cost for prior months, updating with new bills.")
 
 
-def render_statement_spending_chart(transactions):
-    if not transactions:
+@traced("analytics.render_statement_spending_chart", rows=len_of_first_arg)
+def render_statement_spending_chart(monthly_totals):
+    """Bar chart of bank-statement totals per month (from queries.monthly_transaction_totals)."""
+    if monthly_totals.empty:
         st.info("No transaction data available.")
         return
 
-    df = pd.DataFrame(transactions)
-
-    df['trans_date'] = pd.to_datetime(df['trans_date'])
-    df['month'] = df['trans_date'].dt.to_period('M').dt.to_timestamp()
-    monthly_totals = df.groupby('month', as_index=False)['amount'].sum()
-
     st.subheader("Monthly Total Spending (Bank Statement)")
-    plt.figure(figsize=(10, 6))
-    sns.barplot(data=monthly_totals, x='month', y='amount', color='skyblue')
-    plt.title("Monthly Total Spending")
-    plt.xlabel("Month")
-    plt.ylabel("Amount")
-    plt.xticks(rotation=45)
-
-    st.pyplot(plt.gcf())
+    bar_chart(monthly_totals, 'month', 'amount', "Monthly Total Spending",
+              "Month", "Amount", color='skyblue')
     
-def render_spending_by_creditor(transactions):
-    if not transactions:
+@traced("analytics.render_spending_by_creditor", rows=len_of_first_arg)
+def render_spending_by_creditor(creditor_totals):
+    """Bar chart of bank-statement totals per creditor (from queries.transaction_totals_by_creditor)."""
+    if creditor_totals.empty:
         st.info("No transaction data available.")
         return
     
-    df = pd.DataFrame(transactions)
-    df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-    
-    creditor_totals = df.groupby('creditor', as_index=False)['amount'].sum()
-    
     st.subheader("Total Spending by Creditor")
     
-    plt.figure(figsize=(10, 6))
-    ax = sns.barplot(
-        data=creditor_totals, 
-        x='creditor', 
-        y='amount', 
-        hue='creditor', 
-        palette='viridis', 
-        dodge=False
-    )
-    legend = ax.get_legend()
-    if legend is not None:
-        legend.remove()
+    bar_chart(creditor_totals, 'creditor', 'amount', "Spending Grouped by Creditor",
+              "Creditor", "Total Amount", palette='viridis', value_labels=True)
 
     
-    plt.title("Spending Grouped by Creditor")
-    plt.xlabel("Creditor")
-    plt.ylabel("Total Amount")
-    plt.xticks(rotation=45, ha='right')
-    
-    ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))
-    for container in ax.containers:
-        ax.bar_label(container, fmt=lambda x: format(x, ',.0f').replace(',', '.'))
-    
-    st.pyplot(plt.gcf())
-
-    
-    
-def render_costs_by_category(transactions):
-    if not transactions:
-        st.info("No transaction data available.")
-        return
-    
-    df = pd.DataFrame(transactions)
-    df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
-    
-    cost_df = df[df['amount'] < 0].copy()
-    if cost_df.empty:
+@traced("analytics.render_costs_by_category", rows=len_of_first_arg)
+def render_costs_by_category(cost_by_category):
+    """Bar chart of costs per category (from queries.cost_totals_by_category)."""
+    if cost_by_category.empty:
         st.info("No cost data available (all amounts are positive).")
         return
     
-    cost_by_category = cost_df.groupby('category', as_index=False)['amount'].sum()
-    cost_by_category['total_cost'] = cost_by_category['amount'].abs()
-    
     st.subheader("Costs Grouped by Category")
     
-    plt.figure(figsize=(10, 6))
-    ax = sns.barplot(
-        data=cost_by_category, 
-        x='category', 
-        y='total_cost', 
-        hue='category', 
-        palette='magma', 
-        dodge=False
+    bar_chart(cost_by_category, 'category', 'total_cost', "Total Costs by Category",
+              "Category", "Cost (absolute value)", palette='magma', value_labels=True)
+
+
+def render_ollama_latency(samples):
+    """
+    Rolling latency histogram and percentiles for recent chat responses.
+    Warm-up requests are almost all model load time, so they are reported
+    separately instead of skewing the chat percentiles.
+    """
+    st.subheader("Model Latency")
+    warmups = [s for s in samples if s["kind"] == "warmup"]
+    if warmups:
+        last = warmups[-1]
+        st.caption(f"{len(warmups)} warm-up load(s), last took {last['total_ms'] / 1000:.1f}s "
+                   f"({last['load_ms'] / 1000:.1f}s loading); not included below.")
+    chats = [s for s in samples if s["kind"] == "chat"]
+    if not chats:
+        st.info("No chat responses recorded yet.")
+        return
+    import numpy as np
+    import pandas as pd
+    df = pd.DataFrame(chats)
+    columns = ["total_ms", "load_ms", "prompt_eval_ms", "eval_ms"]
+    percentiles = df[columns].quantile([0.5, 0.9, 0.99]).round(0)
+    percentiles.index = ["p50", "p90", "p99"]
+    st.dataframe(percentiles)
+
+    counts, edges = np.histogram(df["total_ms"] / 1000, bins=min(20, max(1, len(df))))
+    histogram = pd.DataFrame(
+        {"responses": counts},
+        index=[f"{lo:.1f}-{hi:.1f}s" for lo, hi in zip(edges[:-1], edges[1:])],
     )
-    legend = ax.get_legend()
-    if legend is not None:
-        legend.remove()
+    st.bar_chart(histogram)
+    st.caption(f"Last {len(df)} chat responses, total latency per request. "
+               f"Load time is the part spent loading the model into memory.")
 
-    plt.title("Total Costs by Category")
-    plt.xlabel("Category")
-    plt.ylabel("Cost (absolute value)")
-    plt.xticks(rotation=45, ha='right')
-    
-    ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))
-    for container in ax.containers:
-        ax.bar_label(container, fmt=lambda x: format(x, ',.0f').replace(',', '.'))
-    
-    st.pyplot(plt.gcf())
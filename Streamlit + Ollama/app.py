@@ -1,17 +1,26 @@
 import streamlit as st
-import seaborn as sns
 
-from utils import *
+from Bill import Bill
+from bill_store import BillStore, SORT_ORDERS
+from utils import (
+    extract_text_from_pdf,
+    extract_info,
+    ask_ollama,
+    create_financial_prompt_injection,
+)
 
 from db import (
     initialize_db,
     save_bill,
-    get_bills,
+    bills_from_frame,
     update_bill_recurring_status,
     delete_bill,
-    get_transactions,
     import_statement_xlsx,
+    has_recurring_scores,
+    get_recurring_creditors,
 )
+from recurring import CREDITOR_KEY_VERSION, rescore_all, rescore_creditors, is_recurring_bill
+from snapshot import load_table
 
 from analytics import (
     build_bills_df,
@@ -24,68 +33,91 @@ from analytics import (
     render_last_year_step_function_chart,
     render_statement_spending_chart,
     render_spending_by_creditor,
-    render_costs_by_category
+    render_costs_by_category,
+    render_ollama_latency,
+)
+
+from queries import (
+    monthly_transaction_totals,
+    transaction_totals_by_creditor,
+    cost_totals_by_category,
 )
 
+from config import PROFILE_ENABLED, OLLAMA_WARMUP_ON_START
+from profiler import begin_rerun, get_spans, keep_spans_for_rerun, render_profiler_panel
+from ollama_manager import (
+    start_warm_up,
+    warm_up,
+    pin_model,
+    unload_model,
+    get_status,
+    latency_samples,
+)
+
+
+SECTIONS = ["📤 Upload Bills", "📑 Existing Bills", "📊 Analytics", "🤖 AI Assistant"]
+
 
 def load_bills():
     """Load bills into session state if not already loaded."""
     if "bills" not in st.session_state:
-        st.session_state.bills = get_bills()
+        st.session_state.bills = BillStore(bills_from_frame(load_table("bills")))
         
 def load_transactions():
-    """Load transactions into session state if not already loaded."""
+    """Load transactions into session state (as a DataFrame) if not already loaded."""
     if "transactions" not in st.session_state:
-        transactions = get_transactions()
-        st.session_state.transactions = [t.to_dict() for t in transactions]
+        st.session_state.transactions = load_table("transactions")
+        if not st.session_state.transactions.empty and not has_recurring_scores(CREDITOR_KEY_VERSION):
+            rescore_all()
 
 
 
 def main():
     st.title("Financial Analyzer")
+    profiling = st.sidebar.checkbox("Developer profiler", value=PROFILE_ENABLED)
+    begin_rerun(profiling, st.session_state)
+    if OLLAMA_WARMUP_ON_START:
+        start_warm_up()
     initialize_db()
-    load_bills()
-    load_transactions()
-    
-    injected_prompt = create_financial_prompt_injection(
-        st.session_state.bills, st.session_state.transactions
-    )
-
-    # Set color palette
-    sns.set_palette("deep")
-    sns.set_style("whitegrid")
-
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "📤 Upload Bills", "📑 Existing Bills", "📊 Analytics", "🤖 AI Assistant"
-    ])
-
-    # --- Tab 1: Upload Bills ---
-    with tab1:
+
+    # Only the selected section runs (st.tabs would run all four on every
+    # rerun), so a session pays for pandas, pyarrow and the plotting
+    # libraries only once it opens a section, or takes an action, that needs them.
+    section = st.radio("Section", SECTIONS, horizontal=True, key="section",
+                       label_visibility="collapsed")
+
+    # --- Upload Bills ---
+    if section == SECTIONS[0]:
         st.subheader("Upload Bills & Bank Statements")
         files = st.file_uploader("Upload your bills or bank statements here", accept_multiple_files=True)
         if files:
+            load_bills()
             for file in files:
                 if file.type == "application/pdf":
                     text = extract_text_from_pdf(file)
                     bill = extract_info(text)
-                    if any(b.id == bill.id for b in st.session_state.bills):
+                    if bill.id in st.session_state.bills:
                         st.warning(f"{file.name} already exists.")
                         continue
+                    same_creditor = st.session_state.bills.for_creditor(bill.creditor)
+                    if not bill.recurring and is_recurring_bill(same_creditor, bill):
+                        bill.recurring = True
+                        st.info(f"{bill.creditor} looks like a recurring bill; marked as recurring.")
                     save_bill(bill)
-                    st.session_state.bills.append(bill)
+                    st.session_state.bills.add(bill)
                     st.success(f"Saved {file.name}")
                     st.markdown(f"**Amount:** {int(bill.amount)} kr")
                     st.markdown(f"**Creditor:** {bill.creditor}")
                     st.markdown(f"**Date:** {bill.date}")
                     st.write("---")
                 elif file.type == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet":
-                    import_statement_xlsx(file)
+                    touched_creditors = import_statement_xlsx(file)
+                    rescore_creditors(touched_creditors)
                     st.success(f"Imported transactions from {file.name}")
                 else:
                     st.warning(f"Unsupported file type: {file.type}. Please upload a PDF or XLSX.")
             
-            transactions = get_transactions()
-            st.session_state.transactions = [t.to_dict() for t in transactions]
+            st.session_state.transactions = load_table("transactions")
 
             st.subheader("Transactions Imported")
             st.dataframe(st.session_state.transactions)
@@ -101,43 +133,33 @@ def main():
             recurring_input = st.checkbox("Recurring?")
             submitted = st.form_submit_button("Add Bill")
             if submitted:
+                load_bills()
                 date_str = date_input.strftime("%d.%m.%Y")
                 manual_bill = Bill(creditor_input, date_str, str(amount_input), recurring_input)
-                if any(b.id == manual_bill.id for b in st.session_state.bills):
+                if manual_bill.id in st.session_state.bills:
                     st.warning("This bill already exists in the database.")
                 else:
                     save_bill(manual_bill)
-                    st.session_state.bills.append(manual_bill)
+                    st.session_state.bills.add(manual_bill)
                     st.success(f"Added bill for {creditor_input} on {date_str}")
 
-    # --- Tab 2: Existing Bills ---
-    with tab2:
+    # --- Existing Bills ---
+    if section == SECTIONS[1]:
+        load_bills()
         if not st.session_state.bills:
             st.write("No existing bills found.")            
 
-        creditors = sorted({b.creditor for b in st.session_state.bills})
+        creditors = st.session_state.bills.creditors()
         selected_creditor = st.selectbox("Filter by Creditor", ["All"] + creditors)
-        filtered_bills = [
-            b for b in st.session_state.bills
-            if selected_creditor == "All" or b.creditor == selected_creditor
-        ]
 
         recurring_filter = st.selectbox("Filter by Recurring status", ["All", "Recurring", "One-time"])
-        if recurring_filter != "All":
-            want_recurring = (recurring_filter == "Recurring")
-            filtered_bills = [b for b in filtered_bills if b.recurring == want_recurring]
-
-        sort_option = st.selectbox("Sort by:", [
-            "Date (Newest First)", "Date (Oldest First)", "Creditor (A-Z)", "Creditor (Z-A)"
-        ])
-        if sort_option == "Date (Newest First)":
-            filtered_bills.sort(key=lambda x: parse_date(x.date), reverse=True)
-        elif sort_option == "Date (Oldest First)":
-            filtered_bills.sort(key=lambda x: parse_date(x.date))
-        elif sort_option == "Creditor (A-Z)":
-            filtered_bills.sort(key=lambda x: x.creditor.lower())
-        elif sort_option == "Creditor (Z-A)":
-            filtered_bills.sort(key=lambda x: x.creditor.lower(), reverse=True)
+
+        sort_option = st.selectbox("Sort by:", list(SORT_ORDERS))
+        filtered_bills = st.session_state.bills.view(
+            creditor=None if selected_creditor == "All" else selected_creditor,
+            recurring=None if recurring_filter == "All" else (recurring_filter == "Recurring"),
+            order=sort_option,
+        )
 
         if not filtered_bills:
             st.write("No bills match your current filter.")
@@ -152,24 +174,24 @@ def main():
                 new_status = st.checkbox("Recurring bill", key=cb_key, value=st.session_state[cb_key])
                 if new_status != info["recurring"]:
                     update_bill_recurring_status(info["id"], new_status)
-                    for i, existing in enumerate(st.session_state.bills):
-                        if existing.id == info["id"]:
-                            st.session_state.bills[i].recurring = new_status
-                            break
+                    st.session_state.bills.set_recurring(info["id"], new_status)
                     st.success(f"Updated to {'Recurring' if new_status else 'One-time'}")
                 if st.button("❌ Delete Bill", key=f"delete_{info['id']}"):
                     delete_bill(info["id"])
-                    st.session_state.bills = [x for x in st.session_state.bills if x.id != info["id"]]
+                    st.session_state.bills.remove(info["id"])
                     st.warning(f"Deleted bill {info['amount']} kr")
                 st.write("---")
 
-    # --- Tab 3: Analytics ---
-    with tab3:
+    # --- Analytics ---
+    if section == SECTIONS[2]:
         st.header("Analytics")
+        load_bills()
+        load_transactions()
 
-        if not st.session_state.bills and not st.session_state.transactions:
+        if not st.session_state.bills and st.session_state.transactions.empty:
             st.write("No data to analyze.")
         else:
+            detected_recurring = get_recurring_creditors()
             if st.session_state.bills:
                 # Build a DataFrame from bills
                 df = build_bills_df(st.session_state.bills)
@@ -179,18 +201,20 @@ def main():
                 render_monthly_total_spending(df)
                 render_monthly_recurring_vs_onetime(df)
                 render_yearly_total_spending(df)
-                render_projected_recurring_bills(st.session_state.bills)
+                render_projected_recurring_bills(st.session_state.bills, detected_recurring)
                 render_last_year_step_function_chart(df)
             
-            if st.session_state.transactions:
+            if not st.session_state.transactions.empty:
                 st.subheader("Bank Statement Analytics")
-                render_statement_spending_chart(st.session_state.transactions)
-                render_spending_by_creditor(st.session_state.transactions)
-                render_costs_by_category(st.session_state.transactions)
+                render_statement_spending_chart(monthly_transaction_totals())
+                render_spending_by_creditor(transaction_totals_by_creditor())
+                render_costs_by_category(cost_totals_by_category())
+                if not st.session_state.bills:
+                    render_projected_recurring_bills([], detected_recurring)
 
             
-        # --- Tab 4: AI Assistant ---
-    with tab4:
+    # --- AI Assistant ---
+    if section == SECTIONS[3]:
         st.header("AI Assistant (Local Ollama)")
         if "ollama_history" not in st.session_state:
             st.session_state["ollama_history"] = []
@@ -206,16 +230,45 @@ def main():
 
         if submit_button and user_input:
             st.session_state["ollama_history"].append({"role": "user", "content": user_input})
+            load_bills()
+            load_transactions()
+            injected_prompt = create_financial_prompt_injection(
+                st.session_state.bills, st.session_state.transactions
+            )
             with st.spinner("Thinking..."):
                 answer = ask_ollama(st.session_state["ollama_history"], injected_prompt)
             st.session_state["ollama_history"].append({"role": "assistant", "content": answer})
             st.session_state["clear_input"] = True
+            keep_spans_for_rerun(st.session_state)
             st.rerun()
 
         for msg in reversed(st.session_state["ollama_history"]):
             role_label = "You" if msg["role"] == "user" else "Assistant"
             st.write(f"**{role_label}:** {msg['content']}")
 
+        with st.expander("Model status & latency"):
+            status = get_status()
+            st.write(f"**Status:** {status['state']} (keep_alive: {status['keep_alive']})")
+            if status["detail"]:
+                st.caption(status["detail"])
+            col_warm, col_pin, col_unload = st.columns(3)
+            if col_warm.button("Warm up"):
+                warm_up()
+                keep_spans_for_rerun(st.session_state)
+                st.rerun()
+            if col_pin.button("Pin in memory"):
+                pin_model()
+                keep_spans_for_rerun(st.session_state)
+                st.rerun()
+            if col_unload.button("Unload"):
+                unload_model()
+                keep_spans_for_rerun(st.session_state)
+                st.rerun()
+            render_ollama_latency(latency_samples())
+
+    if profiling:
+        render_profiler_panel(get_spans())
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,189 @@
+import bisect
+import datetime
+import functools
+
+from utils import parse_date
+
+
+SORT_ORDERS = {
+    "Date (Newest First)": ("date", True),
+    "Date (Oldest First)": ("date", False),
+    "Creditor (A-Z)": ("creditor", False),
+    "Creditor (Z-A)": ("creditor", True),
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _date_keys(date_str):
+    """(date, "YYYY-MM") for a bill date string; undated bills sort first with no month."""
+    # Bills share few distinct dates, and strptime/strftime dominated building a store.
+    try:
+        date_key = parse_date(date_str)
+    except (TypeError, ValueError):
+        return datetime.datetime.min, None
+    return date_key, date_key.strftime("%Y-%m")
+
+
+class BillStore:
+    """
+    Session-scoped bill collection keyed by bill id.
+
+    Lookups and recurring toggles are O(1) dict operations. Secondary
+    indexes by creditor, month and recurring status are dicts too, so adding
+    or removing a bill updates them in O(1). The sorted views by date and by
+    creditor are Python lists kept in order with bisect: finding the position
+    is O(log n) but the insert or delete shifts the list, O(n) (a memmove,
+    well under a millisecond at 100k bills). Building the store sorts once,
+    O(n log n), instead of inserting bill by bill.
+    """
+
+    def __init__(self, bills=()):
+        self._by_id = {}
+        self._by_creditor = {}
+        self._by_month = {}
+        self._by_recurring = {True: {}, False: {}}
+        self._sort_keys = {}
+        self._frame = None
+        # A later bill with the same id replaces an earlier one, as with upsert.
+        for bill in {bill.id: bill for bill in bills}.values():
+            self._index(bill)
+        self._by_date = sorted((keys[0], i) for i, keys in self._sort_keys.items())
+        self._by_creditor_name = sorted((keys[1], i) for i, keys in self._sort_keys.items())
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, bill_id):
+        return bill_id in self._by_id
+
+    def get(self, bill_id):
+        return self._by_id.get(bill_id)
+
+    def add(self, bill):
+        """Add a bill; returns False if one with the same id is already stored."""
+        if bill.id in self._by_id:
+            return False
+        self._insert(bill)
+        return True
+
+    def upsert(self, bill):
+        """Add a bill, replacing any stored bill with the same id."""
+        if bill.id in self._by_id:
+            self.remove(bill.id)
+        self._insert(bill)
+
+    def remove(self, bill_id):
+        """Remove a bill by id; returns the removed bill or None."""
+        bill = self._by_id.pop(bill_id, None)
+        if bill is None:
+            return None
+        date_key, creditor_key, month = self._sort_keys.pop(bill_id)
+        self._frame = None
+        self._discard(self._by_creditor, bill.creditor, bill_id)
+        self._discard(self._by_month, month, bill_id)
+        self._by_recurring[bool(bill.recurring)].pop(bill_id, None)
+        self._remove_sorted(self._by_date, (date_key, bill_id))
+        self._remove_sorted(self._by_creditor_name, (creditor_key, bill_id))
+        return bill
+
+    def set_recurring(self, bill_id, recurring):
+        """Flip the recurring flag on a stored bill."""
+        bill = self._by_id[bill_id]
+        self._by_recurring[bool(bill.recurring)].pop(bill_id, None)
+        bill.recurring = recurring
+        self._by_recurring[bool(recurring)][bill_id] = None
+        self._frame = None
+
+    def creditors(self):
+        """Distinct creditor names, sorted."""
+        return sorted(self._by_creditor)
+
+    def for_creditor(self, creditor):
+        return [self._by_id[i] for i in self._by_creditor.get(creditor, ())]
+
+    def months(self):
+        """(year_month, bills) pairs for every month that has dated bills."""
+        return [(month, [self._by_id[i] for i in self._by_month[month]]) for month in self._months()]
+
+    def frame(self):
+        """
+        DataFrame of the dated bills (year_month, amount, recurring, creditor)
+        in month order. Built from the month index on the first call after a
+        change and cached until the next one; callers must not modify it.
+        """
+        if self._frame is None:
+            import pandas as pd
+            ids = [i for month in self._months() for i in self._by_month[month]]
+            bills = [self._by_id[i] for i in ids]
+            self._frame = pd.DataFrame({
+                "year_month": [self._sort_keys[i][2] for i in ids],
+                "amount": [float(b.amount) for b in bills],
+                "recurring": [b.recurring for b in bills],
+                "creditor": [b.creditor for b in bills],
+            })
+        return self._frame
+
+    def _months(self):
+        """Months that have dated bills, in order (undated bills are indexed under None)."""
+        return sorted(month for month in self._by_month if month is not None)
+
+    def view(self, creditor=None, recurring=None, order="Date (Newest First)"):
+        """
+        Bills matching the filters, in one of the SORT_ORDERS.
+
+        Parameters:
+            creditor (str): Only this creditor, or None for all.
+            recurring (bool): Only recurring/one-time bills, or None for both.
+            order (str): A key of SORT_ORDERS.
+        """
+        field, reverse = SORT_ORDERS[order]
+        position = 0 if field == "date" else 1
+
+        if creditor is not None:
+            # Small candidate set: sort just those ids.
+            ids = [
+                i for i in self._by_creditor.get(creditor, ())
+                if recurring is None or i in self._by_recurring[recurring]
+            ]
+            ids.sort(key=lambda i: (self._sort_keys[i][position], i), reverse=reverse)
+        else:
+            ordered = self._by_date if field == "date" else self._by_creditor_name
+            keys = reversed(ordered) if reverse else ordered
+            wanted = None if recurring is None else self._by_recurring[recurring]
+            ids = [i for _, i in keys if wanted is None or i in wanted]
+        return [self._by_id[i] for i in ids]
+
+    def _index(self, bill):
+        """Add `bill` to the dict indexes; returns its (date_key, creditor_key)."""
+        date_key, month = _date_keys(bill.date)
+        creditor_key = (bill.creditor or "").lower()
+        self._by_id[bill.id] = bill
+        self._sort_keys[bill.id] = (date_key, creditor_key, month)
+        self._by_creditor.setdefault(bill.creditor, {})[bill.id] = None
+        self._by_month.setdefault(month, {})[bill.id] = None
+        self._by_recurring[bool(bill.recurring)][bill.id] = None
+        self._frame = None
+        return date_key, creditor_key
+
+    def _insert(self, bill):
+        date_key, creditor_key = self._index(bill)
+        bisect.insort(self._by_date, (date_key, bill.id))
+        bisect.insort(self._by_creditor_name, (creditor_key, bill.id))
+
+    @staticmethod
+    def _discard(index, key, bill_id):
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.pop(bill_id, None)
+        if not ids:
+            del index[key]
+
+    @staticmethod
+    def _remove_sorted(ordered, item):
+        pos = bisect.bisect_left(ordered, item)
+        if pos < len(ordered) and ordered[pos] == item:
+            del ordered[pos]
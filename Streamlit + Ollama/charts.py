@@ -0,0 +1,214 @@
+import io
+import json
+import threading
+
+import streamlit as st
+
+from config import CHART_BACKEND
+from profiler import span
+
+
+# Two interchangeable chart backends:
+#   "matplotlib" renders a PNG on the server and sends it with st.image.
+#   "vega-lite" sends the aggregated rows as a Vega-Lite spec and the
+#   browser draws the chart.
+# Each chart records a "charts.<backend>.<kind>" span with the payload size
+# so the two paths can be compared in the developer profiler.
+
+# matplotlib and seaborn are imported on first use so that startup, and the
+# vega-lite backend, don't pay for them.
+_style_applied = False
+
+# pyplot keeps the current figure in global state, and Streamlit runs every
+# session as a thread of one process, so building and rendering a figure must
+# not interleave between sessions.
+_pyplot_lock = threading.Lock()
+
+def _pyplot():
+    """Import matplotlib/seaborn on first use and apply the app's chart style."""
+    global _style_applied
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    if not _style_applied:
+        sns.set_palette("deep")
+        sns.set_style("whitegrid")
+        _style_applied = True
+    return plt, sns
+
+
+def _vega_values(data):
+    """Serialize a DataFrame to JSON-safe records (timestamps as ISO strings)."""
+    return json.loads(data.to_json(orient="records", date_format="iso"))
+
+
+def _vega_x(data, x, title):
+    import pandas as pd
+    if pd.api.types.is_datetime64_any_dtype(data[x]):
+        return {"field": x, "type": "ordinal", "timeUnit": "yearmonth", "title": title,
+                "axis": {"labelAngle": -45}}
+    return {"field": x, "type": "ordinal", "title": title, "axis": {"labelAngle": -45}}
+
+
+def _long_format(wide, index_name, series_name):
+    """Turn a wide frame (one column per series) into x/series/value rows."""
+    long_df = wide.rename_axis(index_name).reset_index()
+    return long_df.melt(id_vars=index_name, var_name=series_name, value_name="value")
+
+
+def _show_vega(kind, spec):
+    with span(f"charts.vega-lite.{kind}") as s:
+        s.nbytes = len(json.dumps(spec))
+        st.vega_lite_chart(spec, use_container_width=True)
+
+
+def _show_pyplot(kind, plt):
+    with span(f"charts.matplotlib.{kind}") as s:
+        fig = plt.gcf()
+        # Render once with st.pyplot's own settings and send that PNG, so the
+        # timed payload is exactly the one the browser receives.
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+        s.nbytes = buf.tell()
+        plt.close(fig)
+        st.image(buf, use_container_width=True)
+
+
+def bar_chart(data, x, y, title, x_label, y_label, color=None, palette=None,
+              value_labels=False, rotate=True, title_size=None):
+    """
+    Bar chart of one value per category.
+
+    Parameters:
+        data (DataFrame): Aggregated rows, one bar per row.
+        x (str): Category column.
+        y (str): Value column.
+        color (str): Single bar colour, or None for the default palette.
+        palette (str): Colour each bar by category using this palette/scheme.
+        value_labels (bool): Write the value on top of each bar.
+        rotate (bool): Rotate x tick labels 45 degrees.
+        title_size (int): Title font size for matplotlib.
+    """
+    if CHART_BACKEND == "vega-lite":
+        encoding = {
+            "x": _vega_x(data, x, x_label),
+            "y": {"field": y, "type": "quantitative", "title": y_label},
+        }
+        if palette:
+            encoding["color"] = {"field": x, "legend": None, "scale": {"scheme": palette}}
+        mark = {"type": "bar", "color": color} if color else "bar"
+        layers = [{"mark": mark, "encoding": encoding}]
+        if value_labels:
+            layers.append({
+                "mark": {"type": "text", "dy": -6},
+                "encoding": {**encoding, "text": {"field": y, "type": "quantitative", "format": ",.0f"}},
+            })
+        spec = {"title": title, "data": {"values": _vega_values(data[[x, y]])}, "layer": layers}
+        _show_vega("bar", spec)
+        return
+
+    import matplotlib.ticker as mtick
+    with _pyplot_lock:
+        plt, sns = _pyplot()
+        plt.figure(figsize=(10, 6))
+        kwargs = {"hue": x, "palette": palette, "dodge": False} if palette else {"color": color}
+        ax = sns.barplot(data=data, x=x, y=y, **kwargs)
+        legend = ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if title_size:
+            plt.title(title, fontsize=title_size)
+            plt.xlabel(x_label, fontsize=12)
+            plt.ylabel(y_label, fontsize=12)
+        else:
+            plt.title(title)
+            plt.xlabel(x_label)
+            plt.ylabel(y_label)
+        if rotate:
+            plt.xticks(rotation=45, ha='right')
+        if value_labels:
+            ax.yaxis.set_major_formatter(mtick.StrMethodFormatter('{x:,.0f}'))
+            for container in ax.containers:
+                ax.bar_label(container, fmt=lambda v: format(v, ',.0f').replace(',', '.'))
+        plt.tight_layout()
+        _show_pyplot("bar", plt)
+
+
+def stacked_bar_chart(wide, title, x_label, y_label, legend_title, series_labels=None):
+    """
+    Stacked bar chart from a wide frame: index on the x axis, one column per stack.
+
+    Parameters:
+        series_labels (dict): Optional display names for the columns.
+    """
+    if series_labels:
+        wide = wide.rename(columns=series_labels)
+
+    if CHART_BACKEND == "vega-lite":
+        long_df = _long_format(wide, "x", "series")
+        spec = {
+            "title": title,
+            "data": {"values": _vega_values(long_df)},
+            "mark": "bar",
+            "encoding": {
+                "x": {"field": "x", "type": "ordinal", "title": x_label, "axis": {"labelAngle": -45}},
+                "y": {"field": "value", "type": "quantitative", "title": y_label, "stack": "zero"},
+                "color": {"field": "series", "type": "nominal", "title": legend_title},
+            },
+        }
+        _show_vega("stacked_bar", spec)
+        return
+
+    with _pyplot_lock:
+        plt, sns = _pyplot()
+        ax = plt.figure(figsize=(10, 6)).gca()
+        wide.plot(kind="bar", stacked=True, ax=ax)
+        plt.title(title, fontsize=15)
+        plt.xlabel(x_label, fontsize=12)
+        plt.ylabel(y_label, fontsize=12)
+        plt.xticks(rotation=45, ha='right')
+        plt.legend(title=legend_title)
+        plt.tight_layout()
+        _show_pyplot("stacked_bar", plt)
+
+
+def series_chart(wide, title, x_label, y_label, legend_title, area=False):
+    """
+    Line (or stacked area) chart from a wide frame: index on the x axis, one
+    column per series.
+    """
+    kind = "area" if area else "line"
+
+    if CHART_BACKEND == "vega-lite":
+        long_df = _long_format(wide, "x", "series")
+        mark = {"type": "area"} if area else {"type": "line", "point": True}
+        y = {"field": "value", "type": "quantitative", "title": y_label}
+        if area:
+            y["stack"] = "zero"
+        spec = {
+            "title": title,
+            "data": {"values": _vega_values(long_df)},
+            "mark": mark,
+            "encoding": {
+                "x": {"field": "x", "type": "ordinal", "title": x_label, "axis": {"labelAngle": -45}},
+                "y": y,
+                "color": {"field": "series", "type": "nominal", "title": legend_title},
+            },
+        }
+        _show_vega(kind, spec)
+        return
+
+    with _pyplot_lock:
+        plt, sns = _pyplot()
+        ax = plt.figure(figsize=(12, 6)).gca()
+        if area:
+            wide.plot.area(ax=ax)
+        else:
+            for column in wide.columns:
+                plt.plot(wide.index, wide[column], label=column, marker='o')
+        plt.title(title, fontsize=15)
+        plt.xlabel(x_label, fontsize=12)
+        plt.ylabel(y_label, fontsize=12)
+        plt.legend(title=legend_title, bbox_to_anchor=(1.05, 1), loc='upper left')
+        plt.xticks(rotation=45, ha='right')
+        plt.tight_layout()
+        _show_pyplot(kind, plt)
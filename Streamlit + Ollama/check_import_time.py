@@ -0,0 +1,135 @@
+"""
+Cold-start check for app.py.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and prints
+the slowest top-level imports. `import app` does not run main(), so it then
+times a session's first script run with AppTest, in a fresh interpreter
+against a scratch database, for the landing section and the AI Assistant.
+Exits non-zero if either exceeds its budget or if a dependency that should
+load lazily was pulled in.
+
+    python check_import_time.py [--budget-ms 500] [--first-run-budget-ms 250] [--top 15]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from config import FIRST_RUN_BUDGET_MS, IMPORT_TIME_BUDGET_MS, LAZY_MODULES
+
+# Sections whose first run must stay light: the landing section, and the chat
+# for a user who only wants to ask a question.
+FIRST_RUN_SECTIONS = [0, 3]
+
+_FIRST_RUN_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+from app import SECTIONS
+at = AppTest.from_file("app.py", default_timeout=120)
+at.session_state["section"] = SECTIONS[int(sys.argv[1])]
+started = time.perf_counter()
+at.run()
+print(json.dumps({
+    "section": SECTIONS[int(sys.argv[1])],
+    "ms": (time.perf_counter() - started) * 1000,
+    "modules": sorted({name.split(".")[0] for name in sys.modules}),
+    "errors": [e.message for e in at.exception],
+}))
+"""
+
+
+def measure_import_time(module="app"):
+    """
+    Import `module` in a fresh interpreter and parse the -X importtime report.
+
+    Returns:
+        list: (name, self_us, cumulative_us, depth) tuples in import order.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return entries
+
+
+def measure_first_run(section):
+    """
+    Time the first AppTest run of app.py with `section` selected, in a fresh
+    interpreter with a scratch database and no Ollama warm-up.
+
+    Returns:
+        dict: section, ms, modules (top-level names imported) and errors.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, BILLS_DB_PATH=os.path.join(workdir, "bills.db"),
+                   OLLAMA_WARMUP_ON_START="0")
+        result = subprocess.run(
+            [sys.executable, "-c", _FIRST_RUN_SCRIPT, str(section)],
+            cwd=here, env=env, capture_output=True, text=True,
+        )
+    if result.returncode != 0:
+        raise RuntimeError(f"First run of section {section} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check app.py cold-start import time.")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS)
+    parser.add_argument("--first-run-budget-ms", type=float, default=FIRST_RUN_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    entries = measure_import_time()
+    top_level = [e for e in entries if e[3] == 0]
+    total_ms = sum(e[2] for e in top_level) / 1000
+
+    print(f"Slowest top-level imports (of {len(entries)} modules):")
+    for name, _, cumulative_us, _ in sorted(top_level, key=lambda e: e[2], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:9.1f} ms  {name}")
+    print(f"Total: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    imported = {e[0].split(".")[0] for e in entries}
+    eager = sorted(imported & set(LAZY_MODULES))
+    if eager:
+        print(f"FAIL: imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: cold start {total_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+
+    for section in FIRST_RUN_SECTIONS:
+        run = measure_first_run(section)
+        print(f"First run, {run['section']}: {run['ms']:.1f} ms (budget {args.first_run_budget_ms:.0f} ms)")
+        eager = sorted(set(run["modules"]) & set(LAZY_MODULES))
+        if eager:
+            print(f"FAIL: first run of {run['section']} imported: {', '.join(eager)}")
+            failed = True
+        if run["errors"]:
+            print(f"FAIL: first run of {run['section']} raised: {'; '.join(run['errors'])}")
+            failed = True
+        if run["ms"] > args.first_run_budget_ms:
+            print(f"FAIL: first run of {run['section']} took {run['ms']:.1f} ms, "
+                  f"over the budget of {args.first_run_budget_ms:.0f} ms")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import os
 
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bills.db")
+DB_PATH = os.environ.get(
+    "BILLS_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bills.db")
+)
 
 SYSTEM_PROMPT = (
     "You are a helpful and proactive financial assistant. "
@@ -17,6 +19,58 @@ MONTHS_IS = {
     "september": "09", "október": "10", "nóvember": "11", "desember": "12"
 }
 
-OLLAMA_API = "http://localhost:11434/api/generate"
+OLLAMA_API = os.environ.get("OLLAMA_API", "http://localhost:11434/api/generate")
+
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "gemma3:12b")
+
+# How long Ollama keeps the model loaded after a request ("30m", "1h", or -1 to pin).
+# Ollama parses a string with Go's time.ParseDuration, which rejects a bare
+# number like "-1", so numeric values from the environment are sent as ints.
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+if OLLAMA_KEEP_ALIVE.strip().lstrip("-").isdigit():
+    OLLAMA_KEEP_ALIVE = int(OLLAMA_KEEP_ALIVE)
+
+OLLAMA_WARMUP_ON_START = os.environ.get("OLLAMA_WARMUP_ON_START", "1") == "1"
+
+OLLAMA_WARMUP_TIMEOUT = 300
+
+# Number of recent Ollama responses kept for the latency histogram.
+OLLAMA_LATENCY_WINDOW = 200
+
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "0") == "1"
+
+PROFILE_EXPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profile_spans.jsonl")
+
+# Measured cold start is ~300-350 ms; the budget leaves headroom for noise, not for regressions.
+IMPORT_TIME_BUDGET_MS = 500
+
+# Budget for a session's first script run (what a new user waits for), measured
+# with AppTest on the landing section and the AI Assistant; ~70-100 ms today.
+FIRST_RUN_BUDGET_MS = 250
+
+# Heavy dependencies that must not be imported when app.py starts, or by the
+# first run of a section that doesn't use them.
+LAZY_MODULES = [
+    "fitz", "matplotlib", "seaborn", "requests",
+    "pandas", "numpy", "pyarrow", "dateutil", "duckdb",
+]
+
+# "matplotlib" renders PNGs on the server, "vega-lite" draws charts in the browser.
+CHART_BACKEND = os.environ.get("CHART_BACKEND", "matplotlib")
+
+# "sqlite" or "duckdb" (optional dependency) for bank-statement aggregations.
+QUERY_ENGINE = os.environ.get("QUERY_ENGINE", "sqlite")
+
+# Recurring-payment detection: minimum payments per creditor and the
+# periodicity/amount-stability score (0..1) needed to flag it as recurring.
+RECURRING_MIN_OCCURRENCES = 3
+RECURRING_SCORE_THRESHOLD = 0.6
 
-OLLAMA_MODEL = "gemma3:12b"
\ No newline at end of file
+# Headless ingestion (ingest.py): where new files are picked up and where they go afterwards.
+INGEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ingest")
+INGEST_INBOX_DIR = os.path.join(INGEST_DIR, "inbox")
+INGEST_ARCHIVE_DIR = os.path.join(INGEST_DIR, "archive")
+INGEST_QUARANTINE_DIR = os.path.join(INGEST_DIR, "quarantine")
+INGEST_BATCH_SIZE = 50
+INGEST_DEBOUNCE_SECONDS = 2.0
+INGEST_POLL_SECONDS = 5.0
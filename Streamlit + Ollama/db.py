@@ -1,13 +1,14 @@
-import streamlit as st
+import datetime
 import sqlite3
 from Bill import Bill
-import pandas as pd
 from Transaction import Transaction
 from config import DB_PATH
+from profiler import traced, len_of_result
 
 
 
 
+@traced("db.initialize_db")
 def initialize_db():
     """Creates the database and table if they do not exist."""
     conn = sqlite3.connect(DB_PATH)
@@ -34,9 +35,32 @@ def initialize_db():
         trans_hash TEXT UNIQUE
     )
     """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_transactions_creditor ON transactions (creditor)")
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS data_version (
+        name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS recurring_creditors (
+        creditor_key TEXT PRIMARY KEY,
+        creditor TEXT,
+        occurrences INTEGER,
+        median_interval REAL,
+        interval_cv REAL,
+        amount_cv REAL,
+        mean_amount REAL,
+        last_date TEXT,
+        period TEXT,
+        score REAL,
+        is_recurring INTEGER DEFAULT 0
+    )
+    """)
     conn.commit()
     conn.close()
     
+@traced("db.get_transactions", rows=len_of_result)
 def get_transactions():
     """Retrieves all transactions from the database."""
     conn = sqlite3.connect(DB_PATH)
@@ -60,20 +84,53 @@ def get_transactions():
 
 
     
-def import_statement_xlsx(filepath):
-    df = pd.read_excel(filepath, header=4)
+def bump_data_version(cursor, name):
+    """Marks a table as changed so its columnar snapshot is treated as stale."""
+    cursor.execute("""
+        INSERT INTO data_version (name, version) VALUES (?, 1)
+        ON CONFLICT (name) DO UPDATE SET version = version + 1
+    """, (name,))
 
-    st.write("Columns in file:", df.columns.tolist())
-    st.write("Preview of data:", df.head())
+def get_data_version(cursor, name):
+    """Returns the current write version of a table (0 if never written), read on `cursor`."""
+    cursor.execute("SELECT version FROM data_version WHERE name = ?", (name,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
 
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def read_statement_xlsx(filepath):
+    """Reads a bank statement export into a DataFrame."""
+    import pandas as pd
+    return pd.read_excel(filepath, header=4)
+
+# Text dates seen in statement exports, tried in order (ISO first, then day-first).
+STATEMENT_DATE_FORMATS = ["%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y"]
+
+def _iso_date(value):
+    """
+    Statement dates as YYYY-MM-DD. Excel usually gives Timestamps, but a text
+    cell such as "31.12.2024" comes through as a string; values that can't be
+    parsed are returned unchanged.
+    """
+    import pandas as pd
+    if isinstance(value, str):
+        text = value.strip()
+        for fmt in STATEMENT_DATE_FORMATS:
+            try:
+                return datetime.datetime.strptime(text[:10], fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        return value
+    if isinstance(value, datetime.date) and pd.notnull(value):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+def insert_statement_rows(cursor, df):
+    """Inserts statement rows on an open cursor; returns (rows inserted, creditors that got new rows)."""
+    touched_creditors = set()
+    inserted = 0
     
     for _, row in df.iterrows():
-        trans_date = row.get("Dags")
-        if pd.notnull(trans_date) and isinstance(trans_date, pd.Timestamp):
-            trans_date = trans_date.strftime("%Y-%m-%d")
+        trans_date = _iso_date(row.get("Dags"))
         creditor       = row.get("Texti")
         amount     = row.get("Upphæð", 0)
         balance    = row.get("Staða")
@@ -92,23 +149,75 @@ def import_statement_xlsx(filepath):
             transaction.category,
             transaction.trans_hash
         ))
+        if cursor.rowcount:
+            inserted += 1
+            if transaction.creditor is not None:
+                touched_creditors.add(transaction.creditor)
+    if inserted:
+        bump_data_version(cursor, "transactions")
+    return inserted, touched_creditors
+
+@traced("db.import_statement_xlsx")
+def import_statement_xlsx(filepath):
+    """Imports a bank statement and returns the set of creditors that got new rows."""
+    import streamlit as st
+
+    df = read_statement_xlsx(filepath)
+
+    st.write("Columns in file:", df.columns.tolist())
+    st.write("Preview of data:", df.head())
+
+    
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    _, touched_creditors = insert_statement_rows(cursor, df)
     
     conn.commit()
     conn.close()
+    return touched_creditors
+
+def insert_bill(cursor, bill):
+    """Inserts a bill on an open cursor; returns False if it already exists."""
+    cursor.execute("""
+        INSERT OR IGNORE INTO bills (bill_hash, creditor, date, amount, recurring)
+        VALUES (?, ?, ?, ?, ?)
+    """, (bill.id, bill.creditor, bill.date, bill.amount, int(bill.recurring)))
+    if cursor.rowcount != 1:
+        return False
+    bump_data_version(cursor, "bills")
+    return True
 
+@traced("db.save_bill")
 def save_bill(bill):
     """Saves a bill to the database, avoiding duplicates."""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    cursor.execute("""
-        INSERT OR IGNORE INTO bills (id, creditor, date, amount, recurring)
-        VALUES (?, ?, ?, ?, ?)
-    """, (bill.id, bill.creditor, bill.date, bill.amount, int(bill.recurring)))
+    insert_bill(cursor, bill)
 
     conn.commit()
     conn.close()
     
+def bills_from_frame(df):
+    """Builds Bill objects from a bills DataFrame (e.g. a snapshot)."""
+    return [
+        Bill(creditor=creditor, date=date, amount=amount, recurring=bool(recurring))
+        for creditor, date, amount, recurring in zip(
+            df["creditor"], df["date"], df["amount"], df["recurring"]
+        )
+    ]
+
+def get_bills_for_creditor(cursor, creditor):
+    """Bills already stored for `creditor`, read on an open cursor."""
+    cursor.execute(
+        "SELECT creditor, date, amount, recurring FROM bills WHERE creditor = ?", (creditor,)
+    )
+    return [
+        Bill(creditor=creditor, date=date, amount=amount, recurring=bool(recurring))
+        for creditor, date, amount, recurring in cursor.fetchall()
+    ]
+
+@traced("db.get_bills", rows=len_of_result)
 def get_bills():
     """Retrieves all bills from the database."""
     conn = sqlite3.connect(DB_PATH)
@@ -130,20 +239,96 @@ def get_bills():
     conn.close()
     return bills
 
+@traced("db.update_bill_recurring_status")
 def update_bill_recurring_status(bill_id, new_status):
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    cursor.execute("UPDATE bills SET recurring = ? WHERE id = ?", (new_status, bill_id))
+    cursor.execute("UPDATE bills SET recurring = ? WHERE bill_hash = ?", (new_status, bill_id))
+    bump_data_version(cursor, "bills")
     conn.commit()
     conn.close()
     
+@traced("db.delete_bill")
 def delete_bill(bill_id):
     """Deletes a bill from the database."""
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    cursor.execute("DELETE FROM bills WHERE id = ?", (bill_id,))
+    cursor.execute("DELETE FROM bills WHERE bill_hash = ?", (bill_id,))
+    bump_data_version(cursor, "bills")
     conn.commit()
     conn.close()
-    
+
+
+@traced("db.save_recurring_scores")
+def save_recurring_scores(scores, key_version=None):
+    """
+    Upserts per-creditor recurring scores (a DataFrame from recurring.score_recurring).
+    With `key_version`, the stored scores are replaced instead and tagged with
+    that creditor-key scheme, so rows under keys from an older scheme go away.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    if key_version is not None:
+        cursor.execute("DELETE FROM recurring_creditors")
+        cursor.execute("""
+            INSERT INTO data_version (name, version) VALUES ('recurring_keys', ?)
+            ON CONFLICT (name) DO UPDATE SET version = excluded.version
+        """, (key_version,))
+    cursor.executemany("""
+        INSERT OR REPLACE INTO recurring_creditors (
+            creditor_key, creditor, occurrences, median_interval, interval_cv,
+            amount_cv, mean_amount, last_date, period, score, is_recurring
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (
+            row.creditor_key, row.creditor, int(row.occurrences), float(row.median_interval),
+            float(row.interval_cv), float(row.amount_cv), float(row.mean_amount),
+            row.last_date.strftime("%Y-%m-%d"), row.period, float(row.score), int(row.is_recurring)
+        )
+        for row in scores.itertuples(index=False)
+    ])
+    conn.commit()
+    conn.close()
+
+def has_recurring_scores(key_version):
+    """Whether the recurring detector has scored creditors under the `key_version` key scheme."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM recurring_creditors)
+           AND EXISTS (SELECT 1 FROM data_version WHERE name = 'recurring_keys' AND version = ?)
+    """, (key_version,))
+    scored = bool(cursor.fetchone()[0])
+    conn.close()
+    return scored
+
+@traced("db.get_recurring_creditors", rows=len_of_result)
+def get_recurring_creditors():
+    """Retrieves creditors the detector currently flags as recurring."""
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        SELECT creditor_key, creditor, median_interval, mean_amount, period, score
+        FROM recurring_creditors
+        WHERE is_recurring = 1
+        ORDER BY creditor
+    """)
+    rows = cursor.fetchall()
+    conn.close()
+    return [
+        {
+            "creditor_key": row[0],
+            "creditor": row[1],
+            "median_interval": row[2],
+            "mean_amount": row[3],
+            "period": row[4],
+            "score": row[5],
+        }
+        for row in rows
+    ]
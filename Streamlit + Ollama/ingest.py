@@ -0,0 +1,270 @@
+"""
+Headless ingestion daemon.
+
+Watches an inbox directory for PDF bills and XLSX bank statements, parses them
+with the same parsers as the upload tab, and commits them to bills.db in
+batches. Processed files are moved to the archive folder, files that fail to
+parse or insert are moved to the quarantine folder with an .error note.
+
+    python ingest.py                 # watch the default inbox until Ctrl+C
+    python ingest.py --once          # ingest what is there now and exit
+    python ingest.py --inbox ~/Downloads/bank --batch-size 100
+
+Streamlit is never imported, so this can run from cron or a systemd unit.
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from config import (
+    DB_PATH,
+    INGEST_INBOX_DIR,
+    INGEST_ARCHIVE_DIR,
+    INGEST_QUARANTINE_DIR,
+    INGEST_BATCH_SIZE,
+    INGEST_DEBOUNCE_SECONDS,
+    INGEST_POLL_SECONDS,
+)
+from db import (
+    get_bills_for_creditor,
+    initialize_db,
+    insert_bill,
+    insert_statement_rows,
+    read_statement_xlsx,
+)
+from recurring import is_recurring_bill, rescore_creditors
+from snapshot import write_snapshots
+from utils import extract_text_from_pdf, extract_info
+
+SUPPORTED_EXTENSIONS = (".pdf", ".xlsx")
+
+
+class IngestStats:
+    """Running totals printed after each batch and on exit."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.files = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.bills = 0
+        self.transactions = 0
+        self.batches = 0
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        rate = self.files / elapsed if elapsed else 0.0
+        return (
+            f"{self.files} files ({self.failed} quarantined, {self.duplicates} duplicate bills) "
+            f"in {self.batches} batches, {self.bills} bills, {self.transactions} transactions, "
+            f"{elapsed:.1f}s, {rate:.1f} files/s"
+        )
+
+
+def _ingest_file(cursor, path):
+    """
+    Parse one file and insert it on `cursor`.
+
+    Returns:
+        tuple: (kind, rows, touched_creditors) where kind is "bill",
+        "duplicate" or "statement".
+    """
+    if path.lower().endswith(".pdf"):
+        with open(path, "rb") as f:
+            bill = extract_info(extract_text_from_pdf(f))
+        if bill.amount is None or not bill.date:
+            raise ValueError("Could not find an amount and date in the PDF.")
+        # Same detection as the upload tab, against the creditor's bills already on file.
+        if not bill.recurring and is_recurring_bill(get_bills_for_creditor(cursor, bill.creditor), bill):
+            bill.recurring = True
+        inserted = insert_bill(cursor, bill)
+        return ("bill" if inserted else "duplicate"), int(inserted), set()
+
+    inserted, touched = insert_statement_rows(cursor, read_statement_xlsx(path))
+    return "statement", inserted, touched
+
+
+def _move(path, folder, note=None):
+    """Move `path` into `folder` without overwriting an earlier file of the same name."""
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, os.path.basename(path))
+    if os.path.exists(target):
+        stem, ext = os.path.splitext(target)
+        target = f"{stem}.{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+    shutil.move(path, target)
+    if note:
+        with open(target + ".error", "w", encoding="utf-8") as f:
+            f.write(note)
+    return target
+
+
+def ingest_batch(paths, archive_dir, quarantine_dir, stats):
+    """
+    Ingest `paths` in one SQLite transaction.
+
+    Each file runs inside its own savepoint, so a bad file is rolled back and
+    quarantined without losing the rest of the batch. Files are only moved
+    after the batch has committed. A SQLite error such as "database is
+    locked" says nothing about the file, so it rolls back the whole batch and
+    propagates, leaving every file in the inbox.
+    """
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    cursor = conn.cursor()
+    done, failed, touched = [], [], set()
+    try:
+        cursor.execute("BEGIN")
+        for path in paths:
+            cursor.execute("SAVEPOINT ingest_file")
+            try:
+                kind, rows, file_touched = _ingest_file(cursor, path)
+            except sqlite3.OperationalError:
+                if conn.in_transaction:
+                    cursor.execute("ROLLBACK")
+                raise
+            except Exception as e:
+                cursor.execute("ROLLBACK TO ingest_file")
+                cursor.execute("RELEASE ingest_file")
+                failed.append((path, f"{type(e).__name__}: {e}"))
+                continue
+            cursor.execute("RELEASE ingest_file")
+            done.append(path)
+            touched |= file_touched
+            if kind == "bill":
+                stats.bills += rows
+            elif kind == "duplicate":
+                stats.duplicates += 1
+            else:
+                stats.transactions += rows
+        cursor.execute("COMMIT")
+    finally:
+        conn.close()
+
+    for path in done:
+        _move(path, archive_dir)
+    for path, error in failed:
+        _move(path, quarantine_dir, note=error)
+        print(f"  quarantined {os.path.basename(path)}: {error}")
+
+    rescore_creditors(touched)
+    if done:
+        write_snapshots()
+    stats.files += len(done) + len(failed)
+    stats.failed += len(failed)
+    stats.batches += 1
+
+
+class Inbox:
+    """
+    Tracks files in the inbox and reports those that have stopped changing.
+
+    A file is ready once its size and mtime have been unchanged for the
+    debounce period, so half-copied files are never parsed.
+    """
+
+    def __init__(self, path, debounce):
+        self.path = path
+        self.debounce = debounce
+        self.seen = {}
+
+    def ready_files(self):
+        now = time.monotonic()
+        ready = []
+        current = {}
+        for entry in os.scandir(self.path):
+            if not entry.is_file() or not entry.name.lower().endswith(SUPPORTED_EXTENSIONS):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            previous = self.seen.get(entry.path)
+            stable_since = previous[1] if previous and previous[0] == signature else now
+            current[entry.path] = (signature, stable_since)
+            if now - stable_since >= self.debounce:
+                ready.append(entry.path)
+        self.seen = current
+        return sorted(ready)
+
+
+def _start_watcher(path, wake):
+    """Wake the main loop on filesystem events when watchdog is installed; otherwise poll."""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    class _Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            wake.set()
+
+    observer = Observer()
+    observer.schedule(_Handler(), path, recursive=False)
+    observer.daemon = True
+    observer.start()
+    return observer
+
+
+def run(inbox_dir, archive_dir, quarantine_dir, batch_size, debounce, poll, once=False):
+    os.makedirs(inbox_dir, exist_ok=True)
+    initialize_db()
+    stats = IngestStats()
+    inbox = Inbox(inbox_dir, 0 if once else debounce)
+    wake = threading.Event()
+    observer = None if once else _start_watcher(inbox_dir, wake)
+    mode = "once" if once else ("watchdog" if observer else f"polling every {poll}s")
+    print(f"Ingesting from {inbox_dir} into {DB_PATH} ({mode})")
+
+    try:
+        while True:
+            ready = inbox.ready_files()
+            for i in range(0, len(ready), batch_size):
+                batch = ready[i:i + batch_size]
+                batch_started = time.perf_counter()
+                try:
+                    ingest_batch(batch, archive_dir, quarantine_dir, stats)
+                except sqlite3.OperationalError as e:
+                    # e.g. the app holds a write lock; the files stay in the inbox for the next pass.
+                    print(f"Batch rolled back, will retry: {e}")
+                    break
+                elapsed = time.perf_counter() - batch_started
+                print(f"Batch of {len(batch)} files in {elapsed:.2f}s | total: {stats.summary()}")
+            if once:
+                break
+            # Files still settling need another look after the debounce period.
+            timeout = min(poll, debounce) if inbox.seen else poll
+            wake.wait(timeout)
+            wake.clear()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if observer:
+            observer.stop()
+        print(f"Done: {stats.summary()}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder and ingest bills and bank statements.")
+    parser.add_argument("--inbox", default=INGEST_INBOX_DIR)
+    parser.add_argument("--archive", default=INGEST_ARCHIVE_DIR)
+    parser.add_argument("--quarantine", default=INGEST_QUARANTINE_DIR)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE,
+                        help="Files per SQLite commit.")
+    parser.add_argument("--debounce", type=float, default=INGEST_DEBOUNCE_SECONDS,
+                        help="Seconds a file must stay unchanged before it is ingested.")
+    parser.add_argument("--poll", type=float, default=INGEST_POLL_SECONDS,
+                        help="Seconds between inbox scans.")
+    parser.add_argument("--once", action="store_true",
+                        help="Ingest the files currently in the inbox and exit.")
+    args = parser.parse_args()
+    run(args.inbox, args.archive, args.quarantine, args.batch_size,
+        args.debounce, args.poll, once=args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Concurrent-session load test for app.py.
+
+Simulates N users, each running the app through streamlit.testing.v1.AppTest
+against a scratch copy of the database and the stub Ollama server
+(ollama_stub.py). Every user loops over a mix of:
+
+    analytics  a rerun of the Analytics section (every chart)
+    chat       submitting a question in the AI Assistant section
+    upload     importing a bank statement and a PDF-style bill, the same
+               database writes the Upload section performs, then a rerun
+               of Analytics
+
+Each session's first run opens Analytics, the heaviest section, so cold
+starts load both snapshots and draw every chart. Switching sections is timed
+separately as "navigate".
+
+--mode threads (the default) runs every session on its own thread in this
+process, as `streamlit run` does, so sessions share module state (snapshot
+files, the Ollama manager, DuckDB/SQLite connections) and in-process
+contention shows up as errors. All sessions cold-start together, and the
+report shows process RSS before, once all sessions have started and at the
+end, as growth per added session. --mode processes runs each session in its own process
+instead and reports peak RSS per session.
+
+The run also reports per-action rerun latency percentiles and SQLite lock
+contention: time spent in the harness's upload writes, and "database is
+locked" failures from those writes or raised inside the app.
+
+    python loadtest.py --users 8 --iterations 10
+    python loadtest.py --users 4 --mode processes --mix analytics=3,chat=1,upload=1 --json results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "app.py")
+DEFAULT_XLSX = os.path.join(HERE, "TEST_DATA.xlsx")
+
+CHAT_QUESTIONS = [
+    "How much did I spend last month?",
+    "Which creditor costs me the most?",
+    "What are my recurring bills?",
+]
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _rss_mb():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except OSError:
+        return _peak_rss_mb()
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def _settled_rss_mb():
+    """RSS after a garbage collection, so figures and frames already dropped don't count."""
+    import gc
+    gc.collect()
+    return _rss_mb()
+
+
+def _is_lock_error(error):
+    return "database is locked" in str(error)
+
+
+def _timed_write(result, write):
+    """Run a database write, recording its duration and any lock failure."""
+    started = time.perf_counter()
+    try:
+        write()
+    except Exception as e:
+        if not _is_lock_error(e):
+            raise
+        result["lock_errors"] += 1
+    finally:
+        result["write_ms"].append((time.perf_counter() - started) * 1000)
+
+
+def _write_statement(statement):
+    """The Upload section's statement import, minus the Streamlit preview."""
+    import sqlite3
+    from config import DB_PATH
+    from db import insert_statement_rows
+    from recurring import rescore_creditors
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        _, touched = insert_statement_rows(conn.cursor(), statement)
+        conn.commit()
+    finally:
+        conn.close()
+    rescore_creditors(touched)
+
+
+def _upload(result, statement, user, iteration):
+    from Bill import Bill
+    from db import save_bill
+
+    bill = Bill(f"loadtest-user{user}@example.com", f"01.{iteration % 12 + 1:02d}.2024", "9900")
+    _timed_write(result, lambda: _write_statement(statement))
+    _timed_write(result, lambda: save_bill(bill))
+
+
+def _select(at, section):
+    """Select `section` for the next run; returns False if it is already shown."""
+    radio = at.radio(key="section")
+    if radio.value == section:
+        return False
+    radio.set_value(section)
+    return True
+
+
+def _chat(at, question):
+    at.text_input(key="chat_input").input(question)
+    next(b for b in at.button if b.label == "Send").click()
+    return at.run()
+
+
+def run_user(user, iterations, mix, xlsx_path, timeout, seed, on_started=None):
+    """
+    One simulated session; returns its measurements. `on_started` is called
+    after the session's first run (threads mode samples RSS there).
+    """
+    os.chdir(HERE)
+    sys.path.insert(0, HERE)
+    from streamlit.testing.v1 import AppTest
+    from app import SECTIONS
+    from db import read_statement_xlsx
+
+    statement = read_statement_xlsx(xlsx_path)
+    rng = random.Random(seed + user)
+    result = {
+        "user": user,
+        "latency_ms": {},
+        "errors": [],
+        "lock_errors": 0,
+        "write_ms": [],
+        "baseline_rss_mb": _peak_rss_mb(),
+    }
+
+    def record(action, started, at=None):
+        result["latency_ms"].setdefault(action, []).append((time.perf_counter() - started) * 1000)
+        if at is not None and at.exception:
+            for exc in at.exception:
+                message = exc.message or ""
+                if _is_lock_error(message):
+                    result["lock_errors"] += 1
+                result["errors"].append(f"{action}: {message}")
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    at.session_state["section"] = SECTIONS[2]
+    started = time.perf_counter()
+    try:
+        at.run()
+    except Exception as e:
+        result["errors"].append(f"cold_start: {type(e).__name__}: {e}")
+    record("cold_start", started, at)
+    if on_started is not None:
+        on_started()
+
+    actions = [name for name, weight in mix.items() for _ in range(weight)]
+    for iteration in range(iterations):
+        action = rng.choice(actions)
+        started = time.perf_counter()
+        try:
+            if action == "chat" and _select(at, SECTIONS[3]):
+                started = time.perf_counter()
+                at.run()
+                record("navigate", started, at)
+            started = time.perf_counter()
+            if action == "analytics":
+                _select(at, SECTIONS[2])
+                at.run()
+            elif action == "chat":
+                _chat(at, rng.choice(CHAT_QUESTIONS))
+            elif action == "upload":
+                _upload(result, statement, user, iteration)
+                _select(at, SECTIONS[2])
+                at.run()
+        except Exception as e:
+            result["errors"].append(f"{action}: {type(e).__name__}: {e}")
+            if _is_lock_error(e):
+                result["lock_errors"] += 1
+        record(action, started, at)
+
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = int(weight or 1)
+    unknown = set(mix) - {"analytics", "chat", "upload"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Unknown actions: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _prepare_database(workdir, source_db, xlsx_path):
+    """Scratch database for the run: a copy of `source_db`, or one seeded from the test statement."""
+    db_path = os.path.join(workdir, "loadtest.db")
+    if source_db:
+        shutil.copyfile(source_db, db_path)
+    os.environ["BILLS_DB_PATH"] = db_path
+
+    from db import initialize_db, read_statement_xlsx
+    from recurring import rescore_all
+    initialize_db()
+    if not source_db:
+        _write_statement(read_statement_xlsx(xlsx_path))
+    rescore_all()
+    return db_path
+
+
+def run_processes(args):
+    """Every session in its own process."""
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(args.users) as pool:
+        results = pool.starmap(run_user, [
+            (user, args.iterations, args.mix, args.xlsx, args.timeout, args.seed)
+            for user in range(args.users)
+        ])
+    return results, None
+
+
+def _share_apptest_runtime():
+    """
+    Give concurrent AppTest sessions one Runtime, as `streamlit run` has.
+
+    AppTest installs a mock Runtime singleton at the start of every run and
+    clears it at the end, so two runs on different threads break each other
+    ("Runtime hasn't been created!"). Install one shared mock for the whole
+    load test and point AppTest at a subclass, so its per-run set and clear
+    land on the subclass instead.
+    """
+    from unittest.mock import MagicMock
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.testing.v1 import app_test
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    app_test.Runtime = type("PerRunRuntime", (Runtime,), {})
+
+
+def run_threads(args):
+    """
+    Every session on its own thread of this process, started together.
+
+    The baseline RSS is taken after importing what the app imports, so the
+    per-session growth excludes one-off module loading (the first session
+    still pays for caches such as matplotlib's font list).
+    """
+    os.chdir(HERE)
+    sys.path.insert(0, HERE)
+    import matplotlib.pyplot  # noqa: F401
+    import pandas  # noqa: F401
+    import pyarrow  # noqa: F401
+    import seaborn  # noqa: F401
+    from streamlit.testing.v1 import AppTest  # noqa: F401
+    import analytics, bill_store, charts, db, queries, recurring, snapshot, utils  # noqa: F401, E401
+    _share_apptest_runtime()
+
+    memory = {"baseline_mb": _settled_rss_mb()}
+
+    def all_started():
+        memory["started_mb"] = _settled_rss_mb()
+
+    # Every session waits here after its first run, so memory is sampled
+    # once all N sessions exist and before any of them starts its actions.
+    barrier = threading.Barrier(args.users, action=all_started)
+
+    def on_started():
+        try:
+            barrier.wait(timeout=args.timeout)
+        except threading.BrokenBarrierError:
+            pass
+
+    results = [None] * args.users
+
+    def session(user):
+        try:
+            results[user] = run_user(user, args.iterations, args.mix, args.xlsx,
+                                     args.timeout, args.seed, on_started)
+        except Exception as e:
+            barrier.abort()
+            results[user] = {"user": user, "latency_ms": {}, "lock_errors": 0, "write_ms": [],
+                             "errors": [f"session: {type(e).__name__}: {e}"]}
+
+    threads = [threading.Thread(target=session, args=(user,), name=f"loadtest-user{user}")
+               for user in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    memory["final_mb"] = _settled_rss_mb()
+    memory["per_session_mb"] = (memory.get("started_mb", memory["baseline_mb"]) - memory["baseline_mb"]) / args.users
+    memory["per_session_final_mb"] = (memory["final_mb"] - memory["baseline_mb"]) / args.users
+    return results, memory
+
+
+def report(results, elapsed, memory=None):
+    latencies = {}
+    for r in results:
+        for action, values in r["latency_ms"].items():
+            latencies.setdefault(action, []).extend(values)
+
+    print(f"\n{len(results)} sessions in {elapsed:.1f}s")
+    print(f"\n{'action':<12}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for action, values in sorted(latencies.items()):
+        print(f"{action:<12}{len(values):>7}{_percentile(values, 50):>10.0f}"
+              f"{_percentile(values, 90):>10.0f}{_percentile(values, 99):>10.0f}{max(values):>10.0f}")
+
+    if memory is None:
+        print(f"\n{'session':<10}{'baseline MB':>13}{'peak MB':>10}{'errors':>8}")
+        for r in sorted(results, key=lambda r: r["user"]):
+            print(f"{r['user']:<10}{r['baseline_rss_mb']:>13.0f}{r['peak_rss_mb']:>10.0f}{len(r['errors']):>8}")
+    else:
+        started_mb = memory.get("started_mb")
+        print(f"\nProcess RSS: baseline {memory['baseline_mb']:.0f} MB, "
+              f"all {len(results)} sessions started "
+              f"{'n/a' if started_mb is None else f'{started_mb:.0f} MB'}, final {memory['final_mb']:.0f} MB")
+        print(f"Growth per added session: {memory['per_session_mb']:.1f} MB after the first run, "
+              f"{memory['per_session_final_mb']:.1f} MB at the end")
+
+    writes = [ms for r in results for ms in r["write_ms"]]
+    lock_errors = sum(r["lock_errors"] for r in results)
+    print(f"\nSQLite writes: {len(writes)}, p50 {_percentile(writes, 50):.0f} ms, "
+          f"p99 {_percentile(writes, 99):.0f} ms, 'database is locked' failures "
+          f"(harness writes and app errors): {lock_errors}")
+
+    errors = [e for r in results for e in r["errors"]]
+    for error in errors[:10]:
+        print(f"  error: {error}")
+    if len(errors) > 10:
+        print(f"  ... and {len(errors) - 10} more")
+
+    return {
+        "sessions": len(results),
+        "elapsed_s": elapsed,
+        "latency_ms": {
+            action: {
+                "count": len(values),
+                "p50": _percentile(values, 50),
+                "p90": _percentile(values, 90),
+                "p99": _percentile(values, 99),
+                "max": max(values),
+            }
+            for action, values in latencies.items()
+        },
+        "peak_rss_mb": {r["user"]: r["peak_rss_mb"] for r in results} if memory is None else None,
+        "process_rss_mb": memory,
+        "sqlite": {
+            "writes": len(writes),
+            "write_p50_ms": _percentile(writes, 50),
+            "write_p99_ms": _percentile(writes, 99),
+            "lock_errors": lock_errors,
+        },
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent users of the Streamlit app.")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--mode", choices=["threads", "processes"], default="threads",
+                        help="Sessions as threads of one process (like streamlit run) or one process each.")
+    parser.add_argument("--iterations", type=int, default=10, help="Actions per user after the first load.")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("analytics=2,chat=1,upload=1"),
+                        help="Relative weights, e.g. analytics=2,chat=1,upload=1.")
+    parser.add_argument("--db", help="Database to copy for the run (default: seed from TEST_DATA.xlsx).")
+    parser.add_argument("--xlsx", default=DEFAULT_XLSX, help="Statement used for uploads.")
+    parser.add_argument("--stub-port", type=int, default=11436)
+    parser.add_argument("--stub-load-seconds", type=float, default=2.0)
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds allowed per rerun.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the summary to this file.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    try:
+        # Set before config is first imported, which threads mode shares with the sessions.
+        os.environ["OLLAMA_API"] = f"http://127.0.0.1:{args.stub_port}/api/generate"
+        db_path = _prepare_database(workdir, args.db, args.xlsx)
+
+        from ollama_stub import serve
+        stub = serve(args.stub_port, load_seconds=args.stub_load_seconds)
+
+        print(f"{args.users} users x {args.iterations} actions ({args.mode}), mix {args.mix}, db {db_path}")
+        started = time.perf_counter()
+        run = run_threads if args.mode == "threads" else run_processes
+        results, memory = run(args)
+        elapsed = time.perf_counter() - started
+        stub.shutdown()
+
+        summary = report(results, elapsed, memory)
+        summary["stub_requests"] = stub.model.requests
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import collections
+import threading
+import time
+
+from config import (
+    OLLAMA_API,
+    OLLAMA_MODEL,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_WARMUP_TIMEOUT,
+    OLLAMA_LATENCY_WINDOW,
+)
+
+
+# Model lifecycle for the local Ollama server. State is per process, so every
+# Streamlit session shares one warm-up and one latency history.
+
+# Ollama reports these durations in nanoseconds on the final response line.
+DURATION_FIELDS = ["total_duration", "load_duration", "prompt_eval_duration", "eval_duration"]
+
+_lock = threading.Lock()
+_latencies = collections.deque(maxlen=OLLAMA_LATENCY_WINDOW)
+_status = {"state": "idle", "detail": "", "keep_alive": OLLAMA_KEEP_ALIVE}
+_warm_up_thread = None
+
+
+def record_response(meta, kind="chat"):
+    """
+    Store the timing metadata from a completed Ollama response.
+
+    Parameters:
+        meta (dict): The final (done) response object from /api/generate.
+        kind (str): "chat", "warmup", ...
+    """
+    sample = {"kind": kind, "at": time.time()}
+    for field in DURATION_FIELDS:
+        sample[field.replace("_duration", "_ms")] = meta.get(field, 0) / 1e6
+    sample["prompt_tokens"] = meta.get("prompt_eval_count", 0)
+    sample["eval_tokens"] = meta.get("eval_count", 0)
+    with _lock:
+        _latencies.append(sample)
+        if kind == "chat" and _status["state"] == "unloaded":
+            # The chat request reloaded the model with chat_keep_alive().
+            _status.update(state="ready", detail=f"{OLLAMA_MODEL} reloaded by a chat request",
+                           keep_alive=OLLAMA_KEEP_ALIVE)
+
+
+def latency_samples():
+    """Copy of the recent latency samples, oldest first."""
+    with _lock:
+        return list(_latencies)
+
+
+def get_status():
+    with _lock:
+        return dict(_status)
+
+
+def chat_keep_alive():
+    """
+    keep_alive to send with a chat request: the one the last warm-up or pin
+    set, so a question never shortens a pinned model's lifetime. After an
+    unload (keep_alive 0) the request reloads the model with the default.
+    """
+    with _lock:
+        keep_alive = _status["keep_alive"]
+    return OLLAMA_KEEP_ALIVE if keep_alive == 0 else keep_alive
+
+
+def _set_status(state, detail="", **extra):
+    with _lock:
+        _status.update(state=state, detail=detail, **extra)
+
+
+def _generate(keep_alive, timeout):
+    """Send an empty-prompt request, which loads (or unloads) the model without generating."""
+    import requests
+
+    response = requests.post(
+        OLLAMA_API,
+        json={"model": OLLAMA_MODEL, "prompt": "", "stream": False, "keep_alive": keep_alive},
+        timeout=timeout,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+def warm_up(keep_alive=OLLAMA_KEEP_ALIVE):
+    """Load OLLAMA_MODEL and keep it resident for `keep_alive`."""
+    # keep_alive is only recorded once the server has accepted it, so a failed
+    # pin leaves chat_keep_alive() on the value that is actually in effect.
+    _set_status("loading", f"Loading {OLLAMA_MODEL}")
+    try:
+        meta = _generate(keep_alive, OLLAMA_WARMUP_TIMEOUT)
+    except Exception as e:
+        _set_status("failed", f"{type(e).__name__}: {e}")
+        return False
+    record_response(meta, kind="warmup")
+    _set_status("ready", f"{OLLAMA_MODEL} loaded in {meta.get('load_duration', 0) / 1e9:.1f}s",
+                keep_alive=keep_alive)
+    return True
+
+
+def start_warm_up(keep_alive=OLLAMA_KEEP_ALIVE):
+    """Warm the model up in a background thread, once per process."""
+    global _warm_up_thread
+    with _lock:
+        if _warm_up_thread is not None:
+            return _warm_up_thread
+        _warm_up_thread = threading.Thread(
+            target=warm_up, args=(keep_alive,), name="ollama-warm-up", daemon=True
+        )
+    _warm_up_thread.start()
+    return _warm_up_thread
+
+
+def pin_model():
+    """Keep the model loaded until it is explicitly unloaded."""
+    return warm_up(keep_alive=-1)
+
+
+def unload_model():
+    """Ask Ollama to evict the model now."""
+    try:
+        _generate(0, 30)
+    except Exception as e:
+        _set_status("failed", f"{type(e).__name__}: {e}")
+        return False
+    _set_status("unloaded", f"{OLLAMA_MODEL} unloaded", keep_alive=0)
+    return True
@@ -0,0 +1,141 @@
+"""
+Minimal stand-in for Ollama's /api/generate, for trying the app and the
+model lifecycle code without a GPU.
+
+    python ollama_stub.py --port 11435 --load-seconds 3
+    OLLAMA_API=http://localhost:11435/api/generate streamlit run app.py
+
+The first request after start (or after keep_alive expires or an unload)
+pays --load-seconds, like a real model load. Responses carry the same timing
+fields Ollama sends (in nanoseconds).
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _keep_alive_seconds(value):
+    """
+    Parse Ollama keep_alive values: a number of seconds (negative pins the
+    model) or a duration string such as "30s"/"5m"/"1h". Like Ollama (Go's
+    time.ParseDuration), a string without a unit other than "0" is rejected.
+    """
+    if value is None:
+        return 300.0
+    if isinstance(value, (int, float)):
+        return float("inf") if value < 0 else float(value)
+    if value == "0":
+        return 0.0
+    units = {"s": 1, "m": 60, "h": 3600}
+    if not value or value[-1] not in units:
+        raise ValueError(f'time: missing unit in duration "{value}"')
+    seconds = float(value[:-1]) * units[value[-1]]
+    return float("inf") if seconds < 0 else seconds
+
+
+class StubModel:
+    """Tracks whether the fake model is loaded and when it expires."""
+
+    def __init__(self, load_seconds, tokens_per_second):
+        self.load_seconds = load_seconds
+        self.tokens_per_second = tokens_per_second
+        self.expires_at = 0.0
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def generate(self, payload):
+        keep_alive = _keep_alive_seconds(payload.get("keep_alive"))
+        prompt = payload.get("prompt", "")
+        started = time.perf_counter()
+        with self.lock:
+            self.requests += 1
+            if keep_alive == 0:
+                self.expires_at = 0.0
+                return {"done": True, "done_reason": "unload", "response": ""}, []
+            load = 0.0
+            if time.monotonic() >= self.expires_at:
+                time.sleep(self.load_seconds)
+                load = self.load_seconds
+            self.expires_at = time.monotonic() + keep_alive
+
+        prompt_tokens = max(1, len(prompt.split()))
+        words = [] if not prompt else ["This", "is", "a", "stub", "answer."]
+        prompt_eval = prompt_tokens / (self.tokens_per_second * 10)
+        eval_time = len(words) / self.tokens_per_second
+        time.sleep(prompt_eval + eval_time)
+        total = time.perf_counter() - started
+        final = {
+            "model": payload.get("model"),
+            "response": "",
+            "done": True,
+            "done_reason": "stop" if words else "load",
+            "total_duration": int(total * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_eval * 1e9),
+            "eval_count": len(words),
+            "eval_duration": int(eval_time * 1e9),
+        }
+        return final, words
+
+
+def make_handler(model):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path != "/api/generate":
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            try:
+                final, words = model.generate(payload)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+
+            if payload.get("stream", True):
+                lines = [{"model": payload.get("model"), "response": w + " ", "done": False} for w in words]
+                body = "".join(json.dumps(line) + "\n" for line in lines + [final])
+            else:
+                final["response"] = " ".join(words)
+                body = json.dumps(final)
+            data = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(port=11435, load_seconds=3.0, tokens_per_second=20.0):
+    """Start the stub in a background thread; returns the server (call .shutdown() to stop)."""
+    model = StubModel(load_seconds, tokens_per_second)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(model))
+    server.model = model
+    threading.Thread(target=server.serve_forever, name="ollama-stub", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama /api/generate server.")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--load-seconds", type=float, default=3.0)
+    parser.add_argument("--tokens-per-second", type=float, default=20.0)
+    args = parser.parse_args()
+    server = serve(args.port, args.load_seconds, args.tokens_per_second)
+    print(f"Stub Ollama listening on http://127.0.0.1:{args.port}/api/generate")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
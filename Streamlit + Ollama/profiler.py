@@ -0,0 +1,174 @@
+import functools
+import json
+import threading
+import time
+
+from config import PROFILE_EXPORT_PATH
+
+
+# Spans live on the script thread so concurrent Streamlit sessions don't mix.
+_state = threading.local()
+
+
+# Session-state key for spans handed from a run that ended in st.rerun().
+_CARRIED_KEY = "_profiler_carried_spans"
+
+
+def begin_rerun(enabled, session_state=None):
+    """
+    Reset span collection for a new script run.
+
+    Spans that keep_spans_for_rerun() stashed in `session_state` are put back
+    first, marked as carried, so work done just before an st.rerun() (an
+    Ollama call, say) still shows up in the panel and the export.
+    """
+    carried = session_state.pop(_CARRIED_KEY, []) if session_state is not None else []
+    _state.enabled = bool(enabled)
+    _state.spans = [dict(s, carried=True) for s in carried] if enabled else []
+    _state.stack = []
+
+
+def keep_spans_for_rerun(session_state):
+    """Call before st.rerun() so the next run shows the spans recorded so far."""
+    if is_enabled():
+        session_state[_CARRIED_KEY] = [s for s in get_spans() if not s.get("carried")]
+
+
+def is_enabled():
+    return getattr(_state, "enabled", False)
+
+
+def get_spans():
+    """Return the spans recorded during the current rerun."""
+    return list(getattr(_state, "spans", []))
+
+
+class Span:
+    """Context manager that records wall time, row count and bytes for a block."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.nbytes = None
+
+    def __enter__(self):
+        self.depth = len(_state.stack)
+        self.parent = _state.stack[-1].name if _state.stack else None
+        _state.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        _state.stack.pop()
+        _state.spans.append({
+            "name": self.name,
+            "parent": self.parent,
+            "depth": self.depth,
+            "start": self.start,
+            "ms": elapsed * 1000,
+            "rows": self.rows,
+            "bytes": self.nbytes,
+            "error": exc_type.__name__ if exc_type else None,
+            "carried": False,
+        })
+        return False
+
+
+class _NullSpan:
+    rows = None
+    nbytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Open a span, or a shared no-op when profiling is off."""
+    if not getattr(_state, "enabled", False):
+        return _NULL_SPAN
+    return Span(name)
+
+
+def traced(name, rows=None, nbytes=None):
+    """
+    Decorator that records a span around each call.
+
+    Parameters:
+        name (str): Span name, e.g. "db.get_bills".
+        rows (callable): Optional rows(result, args) -> int.
+        nbytes (callable): Optional nbytes(result, args) -> int.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not getattr(_state, "enabled", False):
+                return func(*args, **kwargs)
+            with Span(name) as s:
+                result = func(*args, **kwargs)
+                try:
+                    if rows:
+                        s.rows = rows(result, args)
+                    if nbytes:
+                        s.nbytes = nbytes(result, args)
+                except Exception:
+                    pass
+            return result
+        return wrapper
+    return decorator
+
+
+def len_of_result(result, args):
+    return len(result) if result is not None else None
+
+
+def len_of_first_arg(result, args):
+    return len(args[0]) if args and args[0] is not None else None
+
+
+def export_spans(spans, path=PROFILE_EXPORT_PATH):
+    """Append spans to a JSONL file, one span per line, tagged with a rerun timestamp."""
+    rerun_ts = time.time()
+    with open(path, "a", encoding="utf-8") as f:
+        for s in spans:
+            f.write(json.dumps({"rerun": rerun_ts, **s}) + "\n")
+    return path
+
+
+def render_profiler_panel(spans):
+    """Show a flame-style breakdown of the current rerun in the sidebar."""
+    import streamlit as st
+
+    st.sidebar.subheader("Hot-path profile")
+    if not spans:
+        st.sidebar.write("No spans recorded this rerun.")
+        return
+
+    total_ms = sum(s["ms"] for s in spans if s["depth"] == 0) or 1.0
+    ordered = sorted(spans, key=lambda s: s["start"])
+    rows = []
+    for s in ordered:
+        width = max(1, int(round(20 * s["ms"] / total_ms)))
+        # Carried spans come from the run that triggered this one via st.rerun().
+        prefix = "↻ " if s.get("carried") else ""
+        rows.append({
+            "span": prefix + "  " * s["depth"] + s["name"],
+            "ms": round(s["ms"], 2),
+            "rows": s["rows"],
+            "bytes": s["bytes"],
+            "share": "█" * width,
+        })
+    carried = sum(1 for s in spans if s.get("carried"))
+    note = f" (↻ {carried} from the run before st.rerun())" if carried else ""
+    st.sidebar.caption(f"{len(spans)} spans, {total_ms:.1f} ms at top level{note}")
+    st.sidebar.dataframe(rows, hide_index=True)
+
+    if st.sidebar.button("Export spans to JSONL"):
+        path = export_spans(spans)
+        st.sidebar.success(f"Wrote {len(spans)} spans to {path}")
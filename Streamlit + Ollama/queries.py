@@ -0,0 +1,129 @@
+import sqlite3
+import threading
+
+from config import DB_PATH, QUERY_ENGINE
+from profiler import traced, len_of_result
+
+
+# Bank-statement aggregations run inside the database and return only the
+# small frames the charts need. QUERY_ENGINE selects SQLite (default) or an
+# embedded DuckDB attached read-only to the same bills.db file. DuckDB is
+# optional; if it is not installed (or its sqlite extension can't be
+# loaded) the SQLite engine is used.
+
+_duckdb_lock = threading.Lock()
+_duckdb_conn = None
+
+# Rows are stored as YYYY-MM-DD (db._iso_date), but older databases can hold
+# DD.MM.YYYY text; both map to a month, anything else is left out.
+MONTHLY_TOTALS_SQL = """
+    SELECT month, SUM(amount) AS amount
+    FROM (
+        SELECT
+            CASE
+                WHEN trans_date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-*'
+                    THEN substr(trans_date, 1, 7) || '-01'
+                WHEN trans_date GLOB '[0-9][0-9].[0-9][0-9].[0-9][0-9][0-9][0-9]*'
+                    THEN substr(trans_date, 7, 4) || '-' || substr(trans_date, 4, 2) || '-01'
+            END AS month,
+            amount
+        FROM {transactions}
+    )
+    WHERE month IS NOT NULL
+    GROUP BY month
+    ORDER BY month
+"""
+
+CREDITOR_TOTALS_SQL = """
+    SELECT creditor, SUM(amount) AS amount
+    FROM {transactions}
+    WHERE creditor IS NOT NULL
+    GROUP BY creditor
+    ORDER BY creditor
+"""
+
+CATEGORY_COSTS_SQL = """
+    SELECT category, SUM(amount) AS amount, ABS(SUM(amount)) AS total_cost
+    FROM {transactions}
+    WHERE amount < 0 AND category IS NOT NULL
+    GROUP BY category
+    ORDER BY category
+"""
+
+
+def _query_sqlite(sql):
+    import pandas as pd
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        return pd.read_sql_query(sql.format(transactions="transactions"), conn)
+    finally:
+        conn.close()
+
+
+def _duckdb_connection():
+    """
+    The process-wide DuckDB connection with bills.db attached, or None if
+    DuckDB is not installed or its sqlite extension can't be loaded.
+
+    Created on first use and kept for the life of the process, so INSTALL,
+    LOAD and ATTACH run once rather than on every query. A failed setup is
+    remembered too, so later queries go straight to SQLite. Call with
+    _duckdb_lock held.
+    """
+    global _duckdb_conn
+    if _duckdb_conn is None:
+        try:
+            import duckdb
+        except ImportError:
+            _duckdb_conn = False
+            return None
+        conn = duckdb.connect()
+        try:
+            try:
+                conn.execute("LOAD sqlite")
+            except duckdb.Error:
+                conn.execute("INSTALL sqlite")
+                conn.execute("LOAD sqlite")
+            # ATTACH takes no parameters, so quote the path as a SQL string literal.
+            path = DB_PATH.replace("'", "''")
+            conn.execute(f"ATTACH '{path}' AS bills_db (TYPE SQLITE, READ_ONLY)")
+        except duckdb.Error:
+            conn.close()
+            _duckdb_conn = False
+            return None
+        _duckdb_conn = conn
+    return _duckdb_conn or None
+
+
+def run_query(sql, engine=None):
+    """Run an aggregation on the configured engine and return a DataFrame."""
+    engine = engine or QUERY_ENGINE
+    if engine == "duckdb":
+        # Streamlit sessions are threads of one process; the shared DuckDB
+        # connection must not be used by two of them at once.
+        with _duckdb_lock:
+            conn = _duckdb_connection()
+            if conn is not None:
+                return conn.execute(sql.format(transactions="bills_db.transactions")).df()
+    return _query_sqlite(sql)
+
+
+@traced("queries.monthly_transaction_totals", rows=len_of_result)
+def monthly_transaction_totals(engine=None):
+    """Total transaction amount per calendar month (month as a Timestamp)."""
+    import pandas as pd
+    df = run_query(MONTHLY_TOTALS_SQL, engine)
+    df["month"] = pd.to_datetime(df["month"])
+    return df
+
+
+@traced("queries.transaction_totals_by_creditor", rows=len_of_result)
+def transaction_totals_by_creditor(engine=None):
+    """Total transaction amount per creditor."""
+    return run_query(CREDITOR_TOTALS_SQL, engine)
+
+
+@traced("queries.cost_totals_by_category", rows=len_of_result)
+def cost_totals_by_category(engine=None):
+    """Sum of negative (cost) transactions per category, with its absolute value."""
+    return run_query(CATEGORY_COSTS_SQL, engine)
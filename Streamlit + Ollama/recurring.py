@@ -0,0 +1,257 @@
+import re
+import sqlite3
+
+from config import (
+    DB_PATH,
+    RECURRING_MIN_OCCURRENCES,
+    RECURRING_SCORE_THRESHOLD,
+)
+from db import save_recurring_scores
+from profiler import traced, len_of_result
+
+
+# Expected gap in days for each period we recognise.
+PERIODS = {
+    "weekly": 7.0,
+    "biweekly": 14.0,
+    "monthly": 30.44,
+    "quarterly": 91.31,
+    "yearly": 365.25,
+}
+
+# A median interval within this relative distance of a period still counts.
+PERIOD_TOLERANCE = 0.25
+
+
+# Trailing reference/store numbers: numeric tokens at the end of the name
+# ("netflix com 4421"), or a run of 3+ digits glued to the last word
+# ("store0412"). Digits inside a name ("N1", "Creditor 2 Store") are kept.
+_TRAILING_REFERENCE = r"(?:\s+\d+)+$|(?<=[^\W\d_])\d{3,}$"
+
+# Bumped whenever normalize_creditors changes, so stored scores are rebuilt.
+CREDITOR_KEY_VERSION = 2
+
+
+def normalize_creditors(creditors):
+    """
+    Vectorized creditor normalization: lower-case, punctuation to spaces,
+    collapse whitespace and drop a trailing reference number, so
+    "NETFLIX.COM 4421" and "Netflix.com" map to the same key. A name that is
+    only digits is kept as it is.
+    """
+    return (
+        creditors.astype("string")
+        .str.lower()
+        .str.replace(r"[\W_]+", " ", regex=True)
+        .str.strip()
+        .str.replace(_TRAILING_REFERENCE, "", regex=True)
+    )
+
+
+def _normalize_unique(creditors):
+    """Normalize only the distinct names and map back, which is much cheaper on large sets."""
+    import pandas as pd
+    codes, uniques = pd.factorize(creditors)
+    keys = normalize_creditors(pd.Series(uniques)).to_numpy()
+    return pd.Series(keys[codes], index=creditors.index)
+
+
+# Icelandic letters that don't decompose to an ASCII base letter.
+_ASCII_FOLD = str.maketrans({"þ": "th", "ð": "d", "æ": "ae", "ö": "o"})
+
+
+def creditor_match_key(creditor):
+    """
+    Accent-free, lower-case key for comparing a PDF bill creditor with a bank
+    statement creditor. Bills are keyed by the sender's e-mail address, so for
+    an address only the organisation part of the domain is kept:
+    "reikningar@veitur.is" -> "veitur", "Veitur ohf." -> "veitur ohf".
+    """
+    import unicodedata
+    name = (creditor or "").strip().lower()
+    if "@" in name:
+        labels = name.rsplit("@", 1)[1].split(".")
+        name = labels[-2] if len(labels) > 1 else labels[0]
+    name = unicodedata.normalize("NFKD", name.translate(_ASCII_FOLD))
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[\W_]+", " ", name).split())
+
+
+def same_creditor(bill_creditor, statement_creditor):
+    """
+    True when a bill creditor and a bank-statement creditor look like the same
+    payee: the bill's key equals the statement key (ignoring spaces) or is one
+    of its words, e.g. "veitur" matches "Veitur ohf." and "husfelag" matches
+    "Húsfélag".
+    """
+    bill_key = creditor_match_key(bill_creditor)
+    statement_key = creditor_match_key(statement_creditor)
+    if not bill_key or not statement_key:
+        return False
+    return (
+        bill_key.replace(" ", "") == statement_key.replace(" ", "")
+        or bill_key in statement_key.split()
+    )
+
+
+@traced("recurring.score_recurring", rows=len_of_result)
+def score_recurring(df, date_col="date", creditor_col="creditor", amount_col="amount"):
+    """
+    Score every creditor group for periodicity and amount stability.
+
+    Parameters:
+        df (DataFrame): One row per payment.
+        date_col (str): Column of datetimes.
+        creditor_col (str): Raw creditor name column.
+        amount_col (str): Amount column (sign is ignored).
+
+    Returns:
+        DataFrame: One row per creditor_key with occurrences, median_interval,
+        interval_cv, amount_cv, mean_amount, last_date, period, score and
+        is_recurring.
+    """
+    import numpy as np
+    import pandas as pd
+
+    df = df[[date_col, creditor_col, amount_col]].dropna()
+    df = pd.DataFrame({
+        "creditor_key": _normalize_unique(df[creditor_col]),
+        "creditor": df[creditor_col],
+        "date": df[date_col],
+        "amount": df[amount_col].abs(),
+    })
+    df = df[df["creditor_key"] != ""]
+    if df.empty:
+        return pd.DataFrame(columns=[
+            "creditor_key", "creditor", "occurrences", "median_interval", "interval_cv",
+            "amount_cv", "mean_amount", "last_date", "period", "score", "is_recurring",
+        ])
+
+    df = df.sort_values(["creditor_key", "date"], kind="mergesort")
+    same_group = df["creditor_key"].to_numpy()[1:] == df["creditor_key"].to_numpy()[:-1]
+    gaps = np.diff(df["date"].to_numpy()).astype("timedelta64[s]").astype(float) / 86400
+    df["interval"] = np.concatenate([[np.nan], np.where(same_group, gaps, np.nan)])
+
+    grouped = df.groupby("creditor_key", sort=False)
+    scores = pd.DataFrame({
+        "creditor": grouped["creditor"].first(),
+        "occurrences": grouped.size(),
+        "median_interval": grouped["interval"].median(),
+        "interval_mean": grouped["interval"].mean(),
+        "interval_std": grouped["interval"].std(ddof=0),
+        "mean_amount": grouped["amount"].mean(),
+        "amount_std": grouped["amount"].std(ddof=0),
+        "last_date": grouped["date"].max(),
+    })
+    scores = scores.fillna({"median_interval": 0.0, "interval_mean": 0.0, "interval_std": 0.0,
+                            "amount_std": 0.0})
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores["interval_cv"] = np.where(scores["interval_mean"] > 0,
+                                         scores["interval_std"] / scores["interval_mean"], 1.0)
+        scores["amount_cv"] = np.where(scores["mean_amount"] > 0,
+                                       scores["amount_std"] / scores["mean_amount"], 1.0)
+
+        # Distance from the median gap to every known period, picked per row.
+        period_days = np.array(list(PERIODS.values()))
+        rel_err = np.abs(scores["median_interval"].to_numpy()[:, None] - period_days) / period_days
+        best = rel_err.argmin(axis=1)
+        best_err = rel_err[np.arange(len(scores)), best]
+
+    period_fit = np.clip(1 - best_err / PERIOD_TOLERANCE, 0, 1)
+    regularity = np.clip(1 - scores["interval_cv"].to_numpy(), 0, 1)
+    stability = np.clip(1 - scores["amount_cv"].to_numpy(), 0, 1)
+
+    scores["period"] = np.where(period_fit > 0, np.array(list(PERIODS))[best], None)
+    scores["score"] = period_fit * (0.6 * regularity + 0.4 * stability)
+    scores["is_recurring"] = (
+        (scores["occurrences"] >= RECURRING_MIN_OCCURRENCES)
+        & (scores["score"] >= RECURRING_SCORE_THRESHOLD)
+    )
+
+    return scores.drop(columns=["interval_mean", "interval_std", "amount_std"]).reset_index()
+
+
+def _load_payments(creditors=None):
+    """Read outgoing transactions, optionally only for the given raw creditor names."""
+    import pandas as pd
+    sql = "SELECT trans_date, creditor, amount FROM transactions WHERE amount < 0"
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        if creditors is None:
+            df = pd.read_sql_query(sql, conn)
+        else:
+            # Chunked to stay under SQLite's bound-parameter limit.
+            creditors = list(creditors)
+            chunks = [
+                pd.read_sql_query(
+                    f"{sql} AND creditor IN ({', '.join('?' * len(chunk))})", conn, params=chunk
+                )
+                for chunk in (creditors[i:i + 500] for i in range(0, len(creditors), 500))
+            ]
+            df = pd.concat(chunks, ignore_index=True)
+    finally:
+        conn.close()
+    df["trans_date"] = pd.to_datetime(df["trans_date"], errors="coerce")
+    return df
+
+
+def _creditors_sharing_keys(creditors):
+    """All raw creditor names whose normalized key matches one of `creditors`."""
+    import pandas as pd
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        # Served from idx_transactions_creditor, so this doesn't scan the table.
+        all_names = pd.read_sql_query(
+            "SELECT DISTINCT creditor FROM transactions WHERE creditor IS NOT NULL", conn
+        )["creditor"]
+    finally:
+        conn.close()
+    keys = set(normalize_creditors(pd.Series(list(creditors))))
+    return all_names[normalize_creditors(all_names).isin(keys)].tolist()
+
+
+@traced("recurring.rescore_all")
+def rescore_all():
+    """Score every creditor from scratch and store the results."""
+    payments = _load_payments()
+    scores = score_recurring(payments, date_col="trans_date")
+    save_recurring_scores(scores, key_version=CREDITOR_KEY_VERSION)
+    return scores
+
+
+@traced("recurring.rescore_creditors")
+def rescore_creditors(creditors):
+    """
+    Re-score only the creditor groups touched by an import.
+
+    Parameters:
+        creditors (set): Raw creditor names that received new transactions,
+            as returned by db.import_statement_xlsx.
+    """
+    if not creditors:
+        return None
+    names = _creditors_sharing_keys(creditors)
+    if not names:
+        return None
+    payments = _load_payments(names)
+    scores = score_recurring(payments, date_col="trans_date")
+    save_recurring_scores(scores)
+    return scores
+
+
+def is_recurring_bill(bills, bill):
+    """Whether `bill`'s creditor looks recurring given the other bills on file."""
+    import pandas as pd
+    from utils import parse_date
+    key = normalize_creditors(pd.Series([bill.creditor])).iloc[0]
+    rows = [
+        {"date": parse_date(b.date), "creditor": b.creditor, "amount": b.amount}
+        for b in list(bills) + [bill]
+        if b.date and b.amount is not None
+    ]
+    if not rows:
+        return False
+    scores = score_recurring(pd.DataFrame(rows))
+    match = scores[scores["creditor_key"] == key]
+    return bool(not match.empty and match["is_recurring"].iloc[0])
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import tempfile
+
+from config import DB_PATH
+from db import get_data_version
+from profiler import traced, len_of_result
+
+
+# Columnar snapshots of the bills and transactions tables, stored as Arrow IPC
+# files next to DB_PATH. Each file carries the table's data_version from the
+# moment it was written; db.py bumps that version on every write, so a
+# snapshot whose version no longer matches is stale and SQLite is used
+# instead (and the snapshot rewritten). Fresh snapshots are memory-mapped and
+# wrapped as Arrow-backed DataFrames without copying the column buffers.
+
+SNAPSHOT_COLUMNS = {
+    "bills": ["creditor", "date", "amount", "recurring", "bill_hash"],
+    "transactions": ["trans_date", "creditor", "amount", "balance", "category", "trans_hash"],
+}
+
+_VERSION_KEY = b"data_version"
+
+
+def snapshot_path(table):
+    return f"{os.path.splitext(DB_PATH)[0]}.{table}.arrow"
+
+
+@traced("snapshot.write_snapshot", rows=len_of_result)
+def write_snapshot(table):
+    """
+    Write `table` to its Arrow IPC snapshot and return the frame that was written.
+
+    The version and rows are read in one SQLite read transaction so the tag
+    always matches the data. The file is written to a unique temporary path
+    and renamed, so readers never see a partial snapshot. Failing to write the
+    file is not an error; the frame is still returned.
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        version = get_data_version(cursor, table)
+        df = pd.read_sql_query(f"SELECT {', '.join(SNAPSHOT_COLUMNS[table])} FROM {table}", conn)
+        cursor.execute("COMMIT")
+    finally:
+        conn.close()
+
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    arrow_table = arrow_table.replace_schema_metadata({_VERSION_KEY: str(version).encode()})
+    path = snapshot_path(table)
+    # Streamlit sessions are threads of one process, so the temporary name must
+    # be unique per writer, not per process.
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path)
+    )
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        os.replace(tmp_path, path)
+    except (OSError, pa.ArrowException):
+        # The snapshot is only a cache: if it can't be written (or, on
+        # Windows, replaced while another session has it mapped) the old one
+        # stays stale and the next load falls back to SQLite.
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+    return arrow_table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+@traced("snapshot.read_snapshot", rows=len_of_result)
+def read_snapshot(table):
+    """Memory-map the snapshot for `table`, or return None if it is missing, stale or unreadable."""
+    import pandas as pd
+    import pyarrow as pa
+
+    path = snapshot_path(table)
+    if not os.path.exists(path):
+        return None
+
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        current_version = get_data_version(conn.cursor(), table)
+    finally:
+        conn.close()
+
+    try:
+        reader = pa.ipc.open_file(pa.memory_map(path, "r"))
+        metadata = reader.schema.metadata or {}
+        if metadata.get(_VERSION_KEY) != str(current_version).encode():
+            return None
+        return reader.read_all().to_pandas(types_mapper=pd.ArrowDtype)
+    except (OSError, pa.ArrowException):
+        # Removed between the exists() check and the open, or corrupt: treat
+        # it as missing so the caller rebuilds it from SQLite.
+        return None
+
+
+@traced("snapshot.load_table", rows=len_of_result)
+def load_table(table):
+    """Load `table` as a DataFrame from its snapshot, rebuilding it from SQLite when stale."""
+    df = read_snapshot(table)
+    if df is None:
+        df = write_snapshot(table)
+    return df
+
+
+def write_snapshots():
+    """Refresh every snapshot; called after a batch of writes."""
+    for table in SNAPSHOT_COLUMNS:
+        write_snapshot(table)
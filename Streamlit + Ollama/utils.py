@@ -1,14 +1,16 @@
-import fitz
 import re
 import datetime
-import requests
 import json
-import streamlit as st
 from Bill import Bill
+from profiler import traced
 
 from config import SYSTEM_PROMPT, MONTHS_IS, OLLAMA_API, OLLAMA_MODEL
+from ollama_manager import chat_keep_alive, record_response
 
+@traced("utils.extract_text_from_pdf", nbytes=lambda text, args: len(text.encode()))
 def extract_text_from_pdf(pdf_file):
+    import fitz
+
     pdf_document = fitz.open(stream=pdf_file.read(), filetype="pdf")
     text = ""
     for page_num in range(len(pdf_document)):
@@ -88,7 +90,10 @@ def summarize_history(messages: list) -> str:
             summary.append(f"Assistant replied briefly: {msg['content'][:100]}...")
     return " | ".join(summary)
 
+@traced("utils.ask_ollama", nbytes=lambda answer, args: len(answer.encode()))
 def ask_ollama(messages: list, injected_prompt="") -> str:
+    import requests
+
     url = OLLAMA_API
 
     MAX_TURNS = 12  # Max back-and-forths to keep verbatim
@@ -105,6 +110,7 @@ def ask_ollama(messages: list, injected_prompt="") -> str:
     payload = {
         "prompt": full_prompt,
         "model": OLLAMA_MODEL,
+        "keep_alive": chat_keep_alive(),
     }
 
     response = requests.post(url, json=payload)
@@ -115,6 +121,8 @@ def ask_ollama(messages: list, injected_prompt="") -> str:
             continue
         parsed = json.loads(line)
         final_text.append(parsed.get("response", ""))
+        if parsed.get("done"):
+            record_response(parsed)
         
     return "".join(final_text)
 
@@ -124,7 +132,7 @@ def create_financial_prompt_injection(bills, transactions):
     
     Parameters:
         bills (list): A list of Bill objects.
-        transactions (list): A list of transaction dictionaries (e.g. from Transaction.to_dict()).
+        transactions (DataFrame): Transactions with creditor, amount and trans_date columns.
     
     Returns:
         str: A string to be injected into the LLM prompt.
@@ -138,10 +146,10 @@ def create_financial_prompt_injection(bills, transactions):
     else:
         prompt_lines.append("No bills available.")
     
-    if transactions:
+    if transactions is not None and len(transactions):
         prompt_lines.append("\nTransactions:")
-        for t in transactions:
-            prompt_lines.append(f"- {t['creditor']}: {int(t['amount'])} kr on {t['trans_date']}")
+        for t in transactions[["creditor", "amount", "trans_date"]].itertuples(index=False):
+            prompt_lines.append(f"- {t.creditor}: {int(t.amount)} kr on {t.trans_date}")
     else:
         prompt_lines.append("No transactions available.")
     